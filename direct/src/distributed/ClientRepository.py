@@ -1,5 +1,7 @@
 """ClientRepository module: contains the ClientRepository class"""
 
+from __future__ import annotations
+
 from .ClientRepositoryBase import ClientRepositoryBase
 from direct.directnotify import DirectNotifyGlobal
 from direct.showbase.MessengerGlobal import messenger
@@ -8,6 +10,7 @@ from .MsgTypesCMU import (
     CLIENT_HEARTBEAT_CMU,
     CLIENT_OBJECT_UPDATE_FIELD_TARGETED_CMU,
     CLIENT_SET_INTEREST_CMU,
+    MSG_ID_BASE_CMU,
     OBJECT_DELETE_CMU,
     OBJECT_DISABLE_CMU,
     OBJECT_GENERATE_CMU,
@@ -37,6 +40,25 @@ class ClientRepository(ClientRepositoryBase):
 
     doNotDeallocateChannel = True
 
+    # These are the sort of messages we may expect from the public Panda
+    # server.  The names of their handler methods are stored in a tuple
+    # indexed by msgType - MSG_ID_BASE_CMU, which is cheaper to look up for
+    # every incoming datagram than a chain of comparisons.  The methods are
+    # looked up on the instance at dispatch time, so overrides still apply.
+    _handlerNames = {
+        SET_DOID_RANGE_CMU: 'handleSetDoIdrange',
+        OBJECT_GENERATE_CMU: 'handleGenerate',
+        OBJECT_UPDATE_FIELD_CMU: 'handleUpdateField',
+        OBJECT_DISABLE_CMU: 'handleDisable',
+        OBJECT_DELETE_CMU: 'handleDelete',
+        REQUEST_GENERATES_CMU: 'handleRequestGenerates',
+    }
+    _table: list[str | None] = [None] * (max(_handlerNames) - MSG_ID_BASE_CMU + 1)
+    for _msgType, _name in _handlerNames.items():
+        _table[_msgType - MSG_ID_BASE_CMU] = _name
+    messageHandlers = tuple(_table)
+    del _handlerNames, _table, _msgType, _name
+
     def __init__(self, dcFileNames = None, dcSuffix = '', connectMethod = None,
                  threadedNet = None):
         ClientRepositoryBase.__init__(self, dcFileNames = dcFileNames, dcSuffix = dcSuffix, connectMethod = connectMethod, threadedNet = threadedNet)
@@ -324,21 +346,14 @@ class ClientRepository(ClientRepositoryBase):
         msgType = self.getMsgType()
         self.currentSenderId = None
 
-        # These are the sort of messages we may expect from the public
-        # Panda server.
-
-        if msgType == SET_DOID_RANGE_CMU:
-            self.handleSetDoIdrange(di)
-        elif msgType == OBJECT_GENERATE_CMU:
-            self.handleGenerate(di)
-        elif msgType == OBJECT_UPDATE_FIELD_CMU:
-            self.handleUpdateField(di)
-        elif msgType == OBJECT_DISABLE_CMU:
-            self.handleDisable(di)
-        elif msgType == OBJECT_DELETE_CMU:
-            self.handleDelete(di)
-        elif msgType == REQUEST_GENERATES_CMU:
-            self.handleRequestGenerates(di)
+        index = msgType - MSG_ID_BASE_CMU
+        if 0 <= index < len(self.messageHandlers):
+            handlerName = self.messageHandlers[index]
+        else:
+            handlerName = None
+
+        if handlerName is not None:
+            getattr(self, handlerName)(di)
         else:
             self.handleMessageType(msgType, di)
 
@@ -5,8 +5,6 @@ implementation. """
 
 from panda3d.core import ConfigVariableBool
 
-from direct.showbase.PythonUtil import invertDictLossless
-
 SET_DOID_RANGE_CMU                      = 9001
 CLIENT_OBJECT_GENERATE_CMU              = 9002
 OBJECT_GENERATE_CMU                     = 9003
@@ -18,14 +16,50 @@ CLIENT_DISCONNECT_CMU                   = 9008
 CLIENT_SET_INTEREST_CMU                 = 9009
 OBJECT_SET_ZONE_CMU                     = 9010
 CLIENT_HEARTBEAT_CMU                    = 9011
-CLIENT_OBJECT_UPDATE_FIELD_TARGETED_CMU  = 9011
+CLIENT_OBJECT_UPDATE_FIELD_TARGETED_CMU = 9012
+
+# The CMU message types above occupy one contiguous range of ids, so that
+# a receiver may dispatch on msgType - MSG_ID_BASE_CMU with a list lookup.
+MSG_ID_BASE_CMU = SET_DOID_RANGE_CMU
+MSG_ID_MAX_CMU = CLIENT_OBJECT_UPDATE_FIELD_TARGETED_CMU
 
 if ConfigVariableBool('astron-support', True):
     CLIENT_OBJECT_UPDATE_FIELD = 120  # Matches MsgTypes.CLIENT_OBJECT_SET_FIELD
 else:
     CLIENT_OBJECT_UPDATE_FIELD = 24  # Matches MsgTypes.CLIENT_OBJECT_UPDATE_FIELD
 
-MsgName2Id = {name: value for name, value in globals().items() if isinstance(value, int)}
+MsgName2Id = {
+    'SET_DOID_RANGE_CMU': SET_DOID_RANGE_CMU,
+    'CLIENT_OBJECT_GENERATE_CMU': CLIENT_OBJECT_GENERATE_CMU,
+    'OBJECT_GENERATE_CMU': OBJECT_GENERATE_CMU,
+    'OBJECT_UPDATE_FIELD_CMU': OBJECT_UPDATE_FIELD_CMU,
+    'OBJECT_DISABLE_CMU': OBJECT_DISABLE_CMU,
+    'OBJECT_DELETE_CMU': OBJECT_DELETE_CMU,
+    'REQUEST_GENERATES_CMU': REQUEST_GENERATES_CMU,
+    'CLIENT_DISCONNECT_CMU': CLIENT_DISCONNECT_CMU,
+    'CLIENT_SET_INTEREST_CMU': CLIENT_SET_INTEREST_CMU,
+    'OBJECT_SET_ZONE_CMU': OBJECT_SET_ZONE_CMU,
+    'CLIENT_HEARTBEAT_CMU': CLIENT_HEARTBEAT_CMU,
+    'CLIENT_OBJECT_UPDATE_FIELD_TARGETED_CMU': CLIENT_OBJECT_UPDATE_FIELD_TARGETED_CMU,
+    'CLIENT_OBJECT_UPDATE_FIELD': CLIENT_OBJECT_UPDATE_FIELD,
+}
+
+_VALID_MSG_TYPES = frozenset(MsgName2Id.values())
+
+
+def isValidMsgType(msgType):
+    """Returns true if msgType is one of the message types defined in this
+    module."""
+    return msgType in _VALID_MSG_TYPES
+
+
+def __getattr__(name):
+    # The id->name table is only needed for debugging, so it is created
+    # on first access rather than at import time.  The ids are unique, so
+    # there is no need for the list-valued entries of invertDictLossless.
+    if name == 'MsgId2Names':
+        table = {value: key for key, value in MsgName2Id.items()}
+        globals()['MsgId2Names'] = table
+        return table
 
-# create id->name table for debugging
-MsgId2Names = invertDictLossless(MsgName2Id)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -23,6 +23,7 @@ from panda3d.net import (
 from panda3d.direct import DCFile
 from direct.distributed.MsgTypesCMU import (
     CLIENT_DISCONNECT_CMU,
+    CLIENT_HEARTBEAT_CMU,
     CLIENT_OBJECT_GENERATE_CMU,
     CLIENT_OBJECT_UPDATE_FIELD,
     CLIENT_OBJECT_UPDATE_FIELD_TARGETED_CMU,
@@ -414,6 +415,9 @@ class ServerRepository:
             self.handleClientDeleteObject(datagram, dgi.getUint32())
         elif type == OBJECT_SET_ZONE_CMU:
             self.handleClientObjectSetZone(datagram, dgi)
+        elif type == CLIENT_HEARTBEAT_CMU:
+            # Only keeps the connection alive; there is nothing to do.
+            pass
         else:
             self.handleMessageType(type, dgi)
 
@@ -11,7 +11,7 @@
 import sys
 if sys.version_info < (3, 8):
     print("This version of Python is not supported, use version 3.8 or higher.")
-    exit(1)
+    sys.exit(1)
 
 try:
     import os
@@ -21,14 +21,12 @@ try:
     import threading
     import signal
     import shutil
-    import plistlib
-    import queue
 except KeyboardInterrupt:
     raise
 except:
     print("You are either using an incomplete or an old version of Python!")
     print("Please install the development package of Python and try again.")
-    exit(1)
+    sys.exit(1)
 
 from makepandacore import *
 
@@ -50,6 +48,9 @@ except:
 ##
 ########################################################################
 
+VersionRegex = re.compile(r'^\d+\.\d+(\.\d+)+')
+GitCommitRegex = re.compile('^[a-f0-9]{40}$')
+
 COMPILER=0
 INSTALLER=0
 WHEEL=0
@@ -174,6 +175,11 @@ def parseopts(args):
     global STRDXSDKVERSION, WINDOWS_SDK, MSVC_VERSION, BOOUSEINTELCOMPILER
     global COPY_PYTHON
 
+    # Don't bother setting up the option tables if we only need to show the
+    # help text.
+    if "--help" in args:
+        usage(None)
+
     # Options for which to display a deprecation warning.
     removedopts = [
         "use-touchinput", "no-touchinput", "no-awesomium", "no-directscripts",
@@ -203,11 +209,22 @@ def parseopts(args):
         longopts.append(pkg.lower() + "-incdir=")
         longopts.append(pkg.lower() + "-libdir=")
 
+    # Maps each of the per-package and removed options to the action to
+    # take and the package it applies to, so that these can be handled
+    # with a single lookup.
+    optactions = {}
+    for pkg in PkgListGet() + ['CGGL']:
+        optactions["--use-" + pkg.lower()] = ("use", pkg)
+        optactions["--no-" + pkg.lower()] = ("no", pkg)
+        optactions["--" + pkg.lower() + "-incdir"] = ("incdir", pkg)
+        optactions["--" + pkg.lower() + "-libdir"] = ("libdir", pkg)
+    for opt in removedopts:
+        optactions["--" + opt.rstrip("=")] = ("removed", None)
+
     try:
         opts, extras = getopt.getopt(args, "", longopts)
         for option, value in opts:
-            if (option=="--help"): raise Exception
-            elif (option=="--optimize"): optimize=value
+            if (option=="--optimize"): optimize=value
             elif (option=="--installer"): INSTALLER=1
             elif (option=="--tests"): RUNTESTS=1
             elif (option=="--wheel"): WHEEL=1
@@ -223,7 +240,7 @@ def parseopts(args):
             elif (option=="--arch"): target_archs.append(value.strip())
             elif (option=="--nocolor"): DisableColors()
             elif (option=="--version"):
-                match = re.match(r'^\d+\.\d+(\.\d+)+', value)
+                match = VersionRegex.match(value)
                 if not match:
                     usage("version requires three digits")
                 WHLVERSION = value
@@ -250,24 +267,20 @@ def parseopts(args):
             elif (option=="--use-icl"): BOOUSEINTELCOMPILER = True
             elif (option=="--clean"): clean_build = True
             elif (option=="--no-copy-python"): COPY_PYTHON = False
-            elif (option[2:] in removedopts or option[2:]+'=' in removedopts):
-                Warn("Ignoring removed option %s" % (option))
-            else:
-                for pkg in PkgListGet() + ['CGGL']:
-                    if option == "--use-" + pkg.lower():
-                        PkgEnable(pkg)
-                        break
-                    elif option == "--no-" + pkg.lower():
-                        PkgDisable(pkg)
-                        break
-                    elif option == "--" + pkg.lower() + "-incdir":
-                        PkgSetCustomLocation(pkg)
-                        IncDirectory(pkg, value)
-                        break
-                    elif option == "--" + pkg.lower() + "-libdir":
-                        PkgSetCustomLocation(pkg)
-                        LibDirectory(pkg, value)
-                        break
+            elif option in optactions:
+                action, pkg = optactions[option]
+                if action == "removed":
+                    Warn("Ignoring removed option %s" % (option))
+                elif action == "use":
+                    PkgEnable(pkg)
+                elif action == "no":
+                    PkgDisable(pkg)
+                elif action == "incdir":
+                    PkgSetCustomLocation(pkg)
+                    IncDirectory(pkg, value)
+                elif action == "libdir":
+                    PkgSetCustomLocation(pkg)
+                    LibDirectory(pkg, value)
             if (option == "--everything" or option.startswith("--use-")
                 or option == "--nothing" or option.startswith("--no-")):
                 anything = 1
@@ -299,7 +312,7 @@ def parseopts(args):
     except:
         usage("Invalid setting for OPTIMIZE")
 
-    if GIT_COMMIT is not None and not re.match("^[a-f0-9]{40}$", GIT_COMMIT):
+    if GIT_COMMIT is not None and not GitCommitRegex.match(GIT_COMMIT):
         usage("Invalid SHA-1 hash given for --git-commit option!")
 
     if GetTarget() == 'windows':
@@ -322,7 +335,6 @@ def parseopts(args):
             print(warn_prefix + "  https://github.com/panda3d/panda3d/issues/288")
             print("=========================================================================")
             sys.stdout.flush()
-            time.sleep(1.0)
             sys.exit(1)
 
     if clean_build and os.path.isdir(GetOutputDir()):
@@ -337,18 +349,16 @@ parseopts(sys.argv[1:])
 ##
 ########################################################################
 
-if ("CFLAGS" in os.environ):
-    CFLAGS = os.environ["CFLAGS"].strip()
+CFLAGS = os.environ.get("CFLAGS", CFLAGS).strip()
+CXXFLAGS = os.environ.get("CXXFLAGS", CXXFLAGS).strip()
 
-if ("CXXFLAGS" in os.environ):
-    CXXFLAGS = os.environ["CXXFLAGS"].strip()
+rpm_opt_flags = os.environ.get("RPM_OPT_FLAGS")
+if rpm_opt_flags is not None:
+    rpm_opt_flags = rpm_opt_flags.strip()
+    CFLAGS += " " + rpm_opt_flags
+    CXXFLAGS += " " + rpm_opt_flags
 
-if ("RPM_OPT_FLAGS" in os.environ):
-    CFLAGS += " " + os.environ["RPM_OPT_FLAGS"].strip()
-    CXXFLAGS += " " + os.environ["RPM_OPT_FLAGS"].strip()
-
-if ("LDFLAGS" in os.environ):
-    LDFLAGS = os.environ["LDFLAGS"].strip()
+LDFLAGS = os.environ.get("LDFLAGS", LDFLAGS).strip()
 
 os.environ["MAKEPANDA"] = os.path.abspath(sys.argv[0])
 if GetHost() == "darwin":
@@ -366,7 +376,7 @@ if GetHost() == "darwin":
 if VERSION is None:
     # Take the value from the setup.cfg file.
     VERSION = GetMetadataValue('version')
-    match = re.match(r'^\d+\.\d+(\.\d+)+', VERSION)
+    match = VersionRegex.match(VERSION)
     if not match:
         exit("Invalid version %s in setup.cfg, three digits are required" % (VERSION))
     if WHLVERSION is None:
@@ -386,9 +396,52 @@ if RPMVERSION is None:
 
 MAJOR_VERSION = '.'.join(VERSION.split('.')[:2])
 
+# The platform tags used for macOS builds targeting multiple architectures.
+OSX_ARCH_TAGS = {
+    frozenset(('i386', 'ppc')): 'fat',
+    frozenset(('x86_64', 'i386')): 'intel',
+    frozenset(('x86_64', 'ppc64')): 'fat64',
+    frozenset(('x86_64', 'i386', 'ppc')): 'fat32',
+    frozenset(('x86_64', 'i386', 'ppc64', 'ppc')): 'universal',
+    frozenset(('x86_64', 'arm64')): 'universal2',
+}
+
+# The manylinux docker images are recognized by the version of glibc they
+# ship.  This is a bit of a sloppy check, though.  The first match wins.
+MANYLINUX_LIBCS = (
+    ('manylinux1', ("/lib/libc-2.5.so", "/lib64/libc-2.5.so")),
+    ('manylinux2010', ("/lib/libc-2.12.so", "/lib64/libc-2.12.so")),
+    ('manylinux2014', ("/lib/libc-2.17.so", "/lib64/libc-2.17.so")),
+    ('manylinux_2_24', ("/lib/i386-linux-gnu/libc-2.24.so", "/lib/x86_64-linux-gnu/libc-2.24.so")),
+)
+
 # Now determine the distutils-style platform tag for the target system.
 target = GetTarget()
 target_arch = GetTargetArch()
+
+# The manylinux images have Python installed in /opt/python.  Collect the
+# libc files with one directory listing per libdir instead of checking
+# each candidate file separately.
+manylinux = None
+if target == 'linux' and os.path.isdir("/opt/python"):
+    libc_files = set()
+    for libdir in ("/lib", "/lib64", "/lib/i386-linux-gnu", "/lib/x86_64-linux-gnu"):
+        try:
+            with os.scandir(libdir) as it:
+                for entry in it:
+                    if entry.name.startswith("libc-"):
+                        libc_files.add(libdir + "/" + entry.name)
+        except OSError:
+            pass
+
+    for tag, libcs in MANYLINUX_LIBCS:
+        if not libc_files.isdisjoint(libcs):
+            manylinux = tag
+            break
+    else:
+        if "/lib64/libc-2.28.so" in libc_files and os.path.isfile('/etc/almalinux-release'):
+            manylinux = 'manylinux_2_28'
+
 if target == 'windows':
     if target_arch == 'x64':
         PLATFORM = 'win-amd64'
@@ -401,70 +454,25 @@ elif target == 'darwin':
         arch_tag = target_arch
     elif len(OSX_ARCHS) == 1:
         arch_tag = OSX_ARCHS[0]
-    elif frozenset(OSX_ARCHS) == frozenset(('i386', 'ppc')):
-        arch_tag = 'fat'
-    elif frozenset(OSX_ARCHS) == frozenset(('x86_64', 'i386')):
-        arch_tag = 'intel'
-    elif frozenset(OSX_ARCHS) == frozenset(('x86_64', 'ppc64')):
-        arch_tag = 'fat64'
-    elif frozenset(OSX_ARCHS) == frozenset(('x86_64', 'i386', 'ppc')):
-        arch_tag = 'fat32'
-    elif frozenset(OSX_ARCHS) == frozenset(('x86_64', 'i386', 'ppc64', 'ppc')):
-        arch_tag = 'universal'
-    elif frozenset(OSX_ARCHS) == frozenset(('x86_64', 'arm64')):
-        arch_tag = 'universal2'
     else:
-        raise RuntimeError('No arch tag for arch combination %s' % OSX_ARCHS)
+        arch_tag = OSX_ARCH_TAGS.get(frozenset(OSX_ARCHS))
+        if arch_tag is None:
+            raise RuntimeError('No arch tag for arch combination %s' % OSX_ARCHS)
 
     if arch_tag == 'arm64':
         PLATFORM = 'macosx-11.0-' + arch_tag
     else:
         PLATFORM = 'macosx-10.9-' + arch_tag
 
-elif target == 'linux' and (os.path.isfile("/lib/libc-2.5.so") or os.path.isfile("/lib64/libc-2.5.so")) and os.path.isdir("/opt/python"):
-    # This is manylinux1.  A bit of a sloppy check, though.
-    if target_arch in ('x86_64', 'amd64'):
-        PLATFORM = 'manylinux1-x86_64'
-    elif target_arch in ('arm64', 'aarch64'):
-        PLATFORM = 'manylinux1-aarch64'
-    else:
-        PLATFORM = 'manylinux1-i686'
-
-elif target == 'linux' and (os.path.isfile("/lib/libc-2.12.so") or os.path.isfile("/lib64/libc-2.12.so")) and os.path.isdir("/opt/python"):
-    # Same sloppy check for manylinux2010.
-    if target_arch in ('x86_64', 'amd64'):
-        PLATFORM = 'manylinux2010-x86_64'
-    elif target_arch in ('arm64', 'aarch64'):
-        PLATFORM = 'manylinux2010-aarch64'
-    else:
-        PLATFORM = 'manylinux2010-i686'
-
-elif target == 'linux' and (os.path.isfile("/lib/libc-2.17.so") or os.path.isfile("/lib64/libc-2.17.so")) and os.path.isdir("/opt/python"):
-    # Same sloppy check for manylinux2014.
-    if target_arch in ('x86_64', 'amd64'):
-        PLATFORM = 'manylinux2014-x86_64'
-    elif target_arch in ('arm64', 'aarch64'):
-        PLATFORM = 'manylinux2014-aarch64'
-    else:
-        PLATFORM = 'manylinux2014-i686'
-
-elif target == 'linux' and (os.path.isfile("/lib/i386-linux-gnu/libc-2.24.so") or os.path.isfile("/lib/x86_64-linux-gnu/libc-2.24.so")) and os.path.isdir("/opt/python"):
-    # Same sloppy check for manylinux_2_24.
-    if target_arch in ('x86_64', 'amd64'):
-        PLATFORM = 'manylinux_2_24-x86_64'
-    elif target_arch in ('arm64', 'aarch64'):
-        PLATFORM = 'manylinux_2_24-aarch64'
-    else:
-        PLATFORM = 'manylinux_2_24-i686'
-
-elif target == 'linux' and os.path.isfile("/lib64/libc-2.28.so") and os.path.isfile('/etc/almalinux-release') and os.path.isdir("/opt/python"):
-    # Same sloppy check for manylinux_2_28.
+elif manylinux is not None:
     if target_arch in ('x86_64', 'amd64'):
-        PLATFORM = 'manylinux_2_28-x86_64'
+        PLATFORM = manylinux + '-x86_64'
     elif target_arch in ('arm64', 'aarch64'):
-        PLATFORM = 'manylinux_2_28-aarch64'
-    else:
+        PLATFORM = manylinux + '-aarch64'
+    elif manylinux == 'manylinux_2_28':
         raise RuntimeError('Unhandled arch %s, please file a bug report!' % (target_arch))
+    else:
+        PLATFORM = manylinux + '-i686'
 
 elif not CrossCompiling():
     if HasTargetArch():
@@ -574,6 +582,7 @@ IncDirectory("ALWAYS", GetOutputDir()+"/tmp")
 IncDirectory("ALWAYS", GetOutputDir()+"/include")
 
 if (COMPILER == "MSVC"):
+    thirdparty_dir = GetThirdpartyDir()
     PkgDisable("X11")
     PkgDisable("GLES")
     PkgDisable("GLES2")
@@ -601,8 +610,8 @@ if (COMPILER == "MSVC"):
                     DefSymbol(pkg, "_UNICODE", "")
             elif (pkg[:2]=="DX"):
                 IncDirectory(pkg, SDK[pkg]      + "/include")
-            elif GetThirdpartyDir() is not None:
-                IncDirectory(pkg, GetThirdpartyDir() + pkg.lower() + "/include")
+            elif thirdparty_dir is not None:
+                IncDirectory(pkg, thirdparty_dir + pkg.lower() + "/include")
     for pkg in DXVERSIONS:
         if not PkgSkip(pkg):
             vnum=pkg[2:]
@@ -623,10 +632,10 @@ if (COMPILER == "MSVC"):
                 # dxerr needs this for __vsnwprintf definition.
                 LibName(pkg, 'legacy_stdio_definitions.lib')
 
-    if not PkgSkip("FREETYPE") and os.path.isdir(GetThirdpartyDir() + "freetype/include/freetype2"):
-        IncDirectory("FREETYPE", GetThirdpartyDir() + "freetype/include/freetype2")
+    if not PkgSkip("FREETYPE") and os.path.isdir(thirdparty_dir + "freetype/include/freetype2"):
+        IncDirectory("FREETYPE", thirdparty_dir + "freetype/include/freetype2")
 
-    IncDirectory("ALWAYS", GetThirdpartyDir() + "extras/include")
+    IncDirectory("ALWAYS", thirdparty_dir + "extras/include")
     LibName("WINSOCK", "wsock32.lib")
     LibName("WINSOCK2", "wsock32.lib")
     LibName("WINSOCK2", "ws2_32.lib")
@@ -650,131 +659,133 @@ if (COMPILER == "MSVC"):
     LibName("GLES2", "libGLESv2.lib")
     LibName("EGL", "libEGL.lib")
     LibName("MSIMG", "msimg32.lib")
-    if (PkgSkip("DIRECTCAM")==0): LibName("DIRECTCAM", "strmiids.lib")
-    if (PkgSkip("DIRECTCAM")==0): LibName("DIRECTCAM", "quartz.lib")
-    if (PkgSkip("DIRECTCAM")==0): LibName("DIRECTCAM", "odbc32.lib")
-    if (PkgSkip("DIRECTCAM")==0): LibName("DIRECTCAM", "odbccp32.lib")
-    if (PkgSkip("MIMALLOC")==0): LibName("MIMALLOC", GetThirdpartyDir() + "mimalloc/lib/mimalloc-static.lib")
+    if (PkgSkip("DIRECTCAM")==0):
+        LibName("DIRECTCAM", "strmiids.lib")
+        LibName("DIRECTCAM", "quartz.lib")
+        LibName("DIRECTCAM", "odbc32.lib")
+        LibName("DIRECTCAM", "odbccp32.lib")
+    if (PkgSkip("MIMALLOC")==0): LibName("MIMALLOC", thirdparty_dir + "mimalloc/lib/mimalloc-static.lib")
     if (PkgSkip("OPENSSL")==0):
-        if os.path.isfile(GetThirdpartyDir() + "openssl/lib/libpandassl.lib"):
-            LibName("OPENSSL", GetThirdpartyDir() + "openssl/lib/libpandassl.lib")
-            LibName("OPENSSL", GetThirdpartyDir() + "openssl/lib/libpandaeay.lib")
-        elif os.path.isfile(GetThirdpartyDir() + "openssl/lib/ssleay32.lib"):
-            LibName("OPENSSL", GetThirdpartyDir() + "openssl/lib/libeay32.lib")
-            LibName("OPENSSL", GetThirdpartyDir() + "openssl/lib/ssleay32.lib")
+        if HasThirdpartyLib("openssl", "libpandassl.lib"):
+            LibName("OPENSSL", thirdparty_dir + "openssl/lib/libpandassl.lib")
+            LibName("OPENSSL", thirdparty_dir + "openssl/lib/libpandaeay.lib")
+        elif HasThirdpartyLib("openssl", "ssleay32.lib"):
+            LibName("OPENSSL", thirdparty_dir + "openssl/lib/libeay32.lib")
+            LibName("OPENSSL", thirdparty_dir + "openssl/lib/ssleay32.lib")
         else:
-            LibName("OPENSSL", GetThirdpartyDir() + "openssl/lib/libssl.lib")
-            LibName("OPENSSL", GetThirdpartyDir() + "openssl/lib/libcrypto.lib")
+            LibName("OPENSSL", thirdparty_dir + "openssl/lib/libssl.lib")
+            LibName("OPENSSL", thirdparty_dir + "openssl/lib/libcrypto.lib")
             LibName("OPENSSL", "crypt32.lib")
             LibName("OPENSSL", "ws2_32.lib")
     if (PkgSkip("PNG")==0):
-        if os.path.isfile(GetThirdpartyDir() + "png/lib/libpng16_static.lib"):
-            LibName("PNG", GetThirdpartyDir() + "png/lib/libpng16_static.lib")
+        if HasThirdpartyLib("png", "libpng16_static.lib"):
+            LibName("PNG", thirdparty_dir + "png/lib/libpng16_static.lib")
         else:
-            LibName("PNG", GetThirdpartyDir() + "png/lib/libpng_static.lib")
+            LibName("PNG", thirdparty_dir + "png/lib/libpng_static.lib")
     if (PkgSkip("TIFF")==0):
-        if os.path.isfile(GetThirdpartyDir() + "tiff/lib/libtiff.lib"):
-            LibName("TIFF", GetThirdpartyDir() + "tiff/lib/libtiff.lib")
+        if HasThirdpartyLib("tiff", "libtiff.lib"):
+            LibName("TIFF", thirdparty_dir + "tiff/lib/libtiff.lib")
         else:
-            LibName("TIFF", GetThirdpartyDir() + "tiff/lib/tiff.lib")
+            LibName("TIFF", thirdparty_dir + "tiff/lib/tiff.lib")
     if (PkgSkip("OPENEXR")==0):
-        if os.path.isfile(GetThirdpartyDir() + "openexr/lib/OpenEXRCore-3_1.lib"):
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/OpenEXR-3_1.lib")
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/IlmThread-3_1.lib")
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/Imath-3_1.lib")
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/Iex-3_1.lib")
-        elif os.path.isfile(GetThirdpartyDir() + "openexr/lib/OpenEXR-3_0.lib"):
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/OpenEXR-3_0.lib")
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/IlmThread-3_0.lib")
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/Imath-3_0.lib")
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/Iex-3_0.lib")
-        elif os.path.isfile(GetThirdpartyDir() + "openexr/lib/OpenEXR.lib"):
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/OpenEXR.lib")
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/IlmThread.lib")
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/Imath.lib")
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/Iex.lib")
+        if HasThirdpartyLib("openexr", "OpenEXRCore-3_1.lib"):
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/OpenEXR-3_1.lib")
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/IlmThread-3_1.lib")
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/Imath-3_1.lib")
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/Iex-3_1.lib")
+        elif HasThirdpartyLib("openexr", "OpenEXR-3_0.lib"):
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/OpenEXR-3_0.lib")
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/IlmThread-3_0.lib")
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/Imath-3_0.lib")
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/Iex-3_0.lib")
+        elif HasThirdpartyLib("openexr", "OpenEXR.lib"):
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/OpenEXR.lib")
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/IlmThread.lib")
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/Imath.lib")
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/Iex.lib")
         else:
             suffix = ""
-            if os.path.isfile(GetThirdpartyDir() + "openexr/lib/IlmImf-2_2.lib"):
+            if HasThirdpartyLib("openexr", "IlmImf-2_2.lib"):
                 suffix = "-2_2"
-            elif os.path.isfile(GetThirdpartyDir() + "openexr/lib/IlmImf-2_3.lib"):
+            elif HasThirdpartyLib("openexr", "IlmImf-2_3.lib"):
                 suffix = "-2_3"
-            elif os.path.isfile(GetThirdpartyDir() + "openexr/lib/IlmImf-2_4.lib"):
+            elif HasThirdpartyLib("openexr", "IlmImf-2_4.lib"):
                 suffix = "-2_4"
-                LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/Imath" + suffix + ".lib")
-            if os.path.isfile(GetThirdpartyDir() + "openexr/lib/IlmImf" + suffix + "_s.lib"):
+                LibName("OPENEXR", thirdparty_dir + "openexr/lib/Imath" + suffix + ".lib")
+            if HasThirdpartyLib("openexr", "IlmImf" + suffix + "_s.lib"):
                 suffix += "_s"  # _s suffix observed for OpenEXR 2.3 only so far
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/IlmImf" + suffix + ".lib")
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/IlmThread" + suffix + ".lib")
-            LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/Iex" + suffix + ".lib")
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/IlmImf" + suffix + ".lib")
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/IlmThread" + suffix + ".lib")
+            LibName("OPENEXR", thirdparty_dir + "openexr/lib/Iex" + suffix + ".lib")
             if suffix == "-2_2":
-                LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/Half.lib")
+                LibName("OPENEXR", thirdparty_dir + "openexr/lib/Half.lib")
             else:
-                LibName("OPENEXR", GetThirdpartyDir() + "openexr/lib/Half" + suffix + ".lib")
-        IncDirectory("OPENEXR", GetThirdpartyDir() + "openexr/include/OpenEXR")
-        IncDirectory("OPENEXR", GetThirdpartyDir() + "openexr/include/Imath")
-    if (PkgSkip("JPEG")==0):     LibName("JPEG",     GetThirdpartyDir() + "jpeg/lib/jpeg-static.lib")
-    if (PkgSkip("ZLIB")==0):     LibName("ZLIB",     GetThirdpartyDir() + "zlib/lib/zlibstatic.lib")
-    if (PkgSkip("VRPN")==0):     LibName("VRPN",     GetThirdpartyDir() + "vrpn/lib/vrpn.lib")
-    if (PkgSkip("VRPN")==0):     LibName("VRPN",     GetThirdpartyDir() + "vrpn/lib/quat.lib")
-    if (PkgSkip("NVIDIACG")==0): LibName("CGGL",     GetThirdpartyDir() + "nvidiacg/lib/cgGL.lib")
-    if (PkgSkip("NVIDIACG")==0): LibName("CGDX9",    GetThirdpartyDir() + "nvidiacg/lib/cgD3D9.lib")
-    if (PkgSkip("NVIDIACG")==0): LibName("NVIDIACG", GetThirdpartyDir() + "nvidiacg/lib/cg.lib")
-    if (PkgSkip("FREETYPE")==0): LibName("FREETYPE", GetThirdpartyDir() + "freetype/lib/freetype.lib")
+                LibName("OPENEXR", thirdparty_dir + "openexr/lib/Half" + suffix + ".lib")
+        IncDirectory("OPENEXR", thirdparty_dir + "openexr/include/OpenEXR")
+        IncDirectory("OPENEXR", thirdparty_dir + "openexr/include/Imath")
+    # Packages that just need their static libraries from thirdparty.
+    for pkg, libs in (
+        ("JPEG",       ("jpeg/lib/jpeg-static.lib",)),
+        ("ZLIB",       ("zlib/lib/zlibstatic.lib",)),
+        ("VRPN",       ("vrpn/lib/vrpn.lib", "vrpn/lib/quat.lib")),
+        ("FREETYPE",   ("freetype/lib/freetype.lib",)),
+        ("FFTW",       ("fftw/lib/fftw3.lib",)),
+        ("ARTOOLKIT",  ("artoolkit/lib/libAR.lib",)),
+        ("OPENCV",     ("opencv/lib/cv.lib", "opencv/lib/highgui.lib", "opencv/lib/cvaux.lib",
+                        "opencv/lib/ml.lib", "opencv/lib/cxcore.lib")),
+        ("FFMPEG",     ("ffmpeg/lib/avcodec.lib", "ffmpeg/lib/avformat.lib", "ffmpeg/lib/avutil.lib")),
+        ("SWSCALE",    ("ffmpeg/lib/swscale.lib",)),
+        ("SWRESAMPLE", ("ffmpeg/lib/swresample.lib",)),
+    ):
+        if not PkgSkip(pkg):
+            for lib in libs:
+                LibName(pkg, thirdparty_dir + lib)
+    if (PkgSkip("NVIDIACG")==0):
+        LibName("CGGL",     thirdparty_dir + "nvidiacg/lib/cgGL.lib")
+        LibName("CGDX9",    thirdparty_dir + "nvidiacg/lib/cgD3D9.lib")
+        LibName("NVIDIACG", thirdparty_dir + "nvidiacg/lib/cg.lib")
     if (PkgSkip("HARFBUZZ")==0):
-        LibName("HARFBUZZ", GetThirdpartyDir() + "harfbuzz/lib/harfbuzz.lib")
-        IncDirectory("HARFBUZZ", GetThirdpartyDir() + "harfbuzz/include/harfbuzz")
-    if (PkgSkip("FFTW")==0):     LibName("FFTW",     GetThirdpartyDir() + "fftw/lib/fftw3.lib")
-    if (PkgSkip("ARTOOLKIT")==0):LibName("ARTOOLKIT",GetThirdpartyDir() + "artoolkit/lib/libAR.lib")
-    if (PkgSkip("OPENCV")==0):   LibName("OPENCV",   GetThirdpartyDir() + "opencv/lib/cv.lib")
-    if (PkgSkip("OPENCV")==0):   LibName("OPENCV",   GetThirdpartyDir() + "opencv/lib/highgui.lib")
-    if (PkgSkip("OPENCV")==0):   LibName("OPENCV",   GetThirdpartyDir() + "opencv/lib/cvaux.lib")
-    if (PkgSkip("OPENCV")==0):   LibName("OPENCV",   GetThirdpartyDir() + "opencv/lib/ml.lib")
-    if (PkgSkip("OPENCV")==0):   LibName("OPENCV",   GetThirdpartyDir() + "opencv/lib/cxcore.lib")
-    if (PkgSkip("FFMPEG")==0):   LibName("FFMPEG",   GetThirdpartyDir() + "ffmpeg/lib/avcodec.lib")
-    if (PkgSkip("FFMPEG")==0):   LibName("FFMPEG",   GetThirdpartyDir() + "ffmpeg/lib/avformat.lib")
-    if (PkgSkip("FFMPEG")==0):   LibName("FFMPEG",   GetThirdpartyDir() + "ffmpeg/lib/avutil.lib")
-    if (PkgSkip("SWSCALE")==0):  LibName("SWSCALE",  GetThirdpartyDir() + "ffmpeg/lib/swscale.lib")
-    if (PkgSkip("SWRESAMPLE")==0):LibName("SWRESAMPLE",GetThirdpartyDir() + "ffmpeg/lib/swresample.lib")
+        LibName("HARFBUZZ", thirdparty_dir + "harfbuzz/lib/harfbuzz.lib")
+        IncDirectory("HARFBUZZ", thirdparty_dir + "harfbuzz/include/harfbuzz")
     if (PkgSkip("FCOLLADA")==0):
-        LibName("FCOLLADA", GetThirdpartyDir() + "fcollada/lib/FCollada.lib")
-        IncDirectory("FCOLLADA", GetThirdpartyDir() + "fcollada/include/FCollada")
+        LibName("FCOLLADA", thirdparty_dir + "fcollada/lib/FCollada.lib")
+        IncDirectory("FCOLLADA", thirdparty_dir + "fcollada/include/FCollada")
     if (PkgSkip("ASSIMP")==0):
-        LibName("ASSIMP", GetThirdpartyDir() + "assimp/lib/assimp.lib")
-        if os.path.isfile(GetThirdpartyDir() + "assimp/lib/IrrXML.lib"):
-            LibName("ASSIMP", GetThirdpartyDir() + "assimp/lib/IrrXML.lib")
-        IncDirectory("ASSIMP", GetThirdpartyDir() + "assimp/include")
+        LibName("ASSIMP", thirdparty_dir + "assimp/lib/assimp.lib")
+        if HasThirdpartyLib("assimp", "IrrXML.lib"):
+            LibName("ASSIMP", thirdparty_dir + "assimp/lib/IrrXML.lib")
+        IncDirectory("ASSIMP", thirdparty_dir + "assimp/include")
     if (PkgSkip("SQUISH")==0):
         if GetOptimize() <= 2:
-            LibName("SQUISH",   GetThirdpartyDir() + "squish/lib/squishd.lib")
+            LibName("SQUISH",   thirdparty_dir + "squish/lib/squishd.lib")
         else:
-            LibName("SQUISH",   GetThirdpartyDir() + "squish/lib/squish.lib")
+            LibName("SQUISH",   thirdparty_dir + "squish/lib/squish.lib")
     if (PkgSkip("OPENAL")==0):
-        LibName("OPENAL", GetThirdpartyDir() + "openal/lib/OpenAL32.lib")
-        if not os.path.isfile(GetThirdpartyDir() + "openal/bin/OpenAL32.dll"):
+        LibName("OPENAL", thirdparty_dir + "openal/lib/OpenAL32.lib")
+        if not os.path.isfile(thirdparty_dir + "openal/bin/OpenAL32.dll"):
             # Link OpenAL Soft statically.
             DefSymbol("OPENAL", "AL_LIBTYPE_STATIC")
     if (PkgSkip("ODE")==0):
-        LibName("ODE",      GetThirdpartyDir() + "ode/lib/ode_single.lib")
+        LibName("ODE",      thirdparty_dir + "ode/lib/ode_single.lib")
         DefSymbol("ODE",    "dSINGLE", "")
     if (PkgSkip("FMODEX")==0):
         if (GetTargetArch() == 'x64'):
-            LibName("FMODEX",   GetThirdpartyDir() + "fmodex/lib/fmodex64_vc.lib")
+            LibName("FMODEX",   thirdparty_dir + "fmodex/lib/fmodex64_vc.lib")
         else:
-            LibName("FMODEX",   GetThirdpartyDir() + "fmodex/lib/fmodex_vc.lib")
+            LibName("FMODEX",   thirdparty_dir + "fmodex/lib/fmodex_vc.lib")
     if (PkgSkip("VORBIS")==0):
         for lib in ('ogg', 'vorbis', 'vorbisfile'):
-            path = GetThirdpartyDir() + "vorbis/lib/lib{0}_static.lib".format(lib)
-            if not os.path.isfile(path):
-                path = GetThirdpartyDir() + "vorbis/lib/{0}.lib".format(lib)
-            LibName("VORBIS", path)
+            if HasThirdpartyLib("vorbis", "lib{0}_static.lib".format(lib)):
+                LibName("VORBIS", thirdparty_dir + "vorbis/lib/lib{0}_static.lib".format(lib))
+            else:
+                LibName("VORBIS", thirdparty_dir + "vorbis/lib/{0}.lib".format(lib))
     if (PkgSkip("OPUS")==0):
-        IncDirectory("OPUS", GetThirdpartyDir() + "opus/include/opus")
+        IncDirectory("OPUS", thirdparty_dir + "opus/include/opus")
         for lib in ('ogg', 'opus', 'opusfile'):
-            path = GetThirdpartyDir() + "opus/lib/lib{0}_static.lib".format(lib)
-            if not os.path.isfile(path):
-                path = GetThirdpartyDir() + "opus/lib/{0}.lib".format(lib)
-            LibName("OPUS", path)
+            if HasThirdpartyLib("opus", "lib{0}_static.lib".format(lib)):
+                LibName("OPUS", thirdparty_dir + "opus/lib/lib{0}_static.lib".format(lib))
+            else:
+                LibName("OPUS", thirdparty_dir + "opus/lib/{0}.lib".format(lib))
     for pkg in MAYAVERSIONS:
         if not PkgSkip(pkg):
             LibName(pkg, '"' + SDK[pkg] + '/lib/Foundation.lib"')
@@ -792,35 +803,36 @@ if (COMPILER == "MSVC"):
             LibName(pkg, SDK[pkg] +  '/lib/paramblk2.lib')
 
     if not PkgSkip("SPEEDTREE"):
+        speedtree_dir = SDK["SPEEDTREE"]
+        speedtree_api = SDK["SPEEDTREEAPI"]
         if GetTargetArch() == 'x64':
-            libdir = SDK["SPEEDTREE"] + "/Lib/Windows/VC10.x64/"
+            libdir = speedtree_dir + "/Lib/Windows/VC10.x64/"
             p64ext = '64'
         else:
-            libdir = SDK["SPEEDTREE"] + "/Lib/Windows/VC10/"
+            libdir = speedtree_dir + "/Lib/Windows/VC10/"
             p64ext = ''
 
         debugext = ''
         if (GetOptimize() <= 2): debugext = "_d"
         libsuffix = "_v%s_VC100MT%s_Static%s.lib" % (
             SDK["SPEEDTREEVERSION"], p64ext, debugext)
-        LibName("SPEEDTREE", "%sSpeedTreeCore%s" % (libdir, libsuffix))
-        LibName("SPEEDTREE", "%sSpeedTreeForest%s" % (libdir, libsuffix))
-        LibName("SPEEDTREE", "%sSpeedTree%sRenderer%s" % (libdir, SDK["SPEEDTREEAPI"], libsuffix))
-        LibName("SPEEDTREE", "%sSpeedTreeRenderInterface%s" % (libdir, libsuffix))
-        if (SDK["SPEEDTREEAPI"] == "OpenGL"):
+        for stem in ("Core", "Forest", speedtree_api + "Renderer", "RenderInterface"):
+            LibName("SPEEDTREE", f"{libdir}SpeedTree{stem}{libsuffix}")
+        if (speedtree_api == "OpenGL"):
             LibName("SPEEDTREE",  "%sglew32.lib" % (libdir))
             LibName("SPEEDTREE",  "glu32.lib")
-        IncDirectory("SPEEDTREE", SDK["SPEEDTREE"] + "/Include")
+        IncDirectory("SPEEDTREE", speedtree_dir + "/Include")
     if (PkgSkip("BULLET")==0):
         suffix = '.lib'
-        if GetTargetArch() == 'x64' and os.path.isfile(GetThirdpartyDir() + "bullet/lib/BulletCollision_x64.lib"):
+        if GetTargetArch() == 'x64' and HasThirdpartyLib("bullet", "BulletCollision_x64.lib"):
             suffix = '_x64.lib'
-        LibName("BULLET", GetThirdpartyDir() + "bullet/lib/LinearMath" + suffix)
-        LibName("BULLET", GetThirdpartyDir() + "bullet/lib/BulletCollision" + suffix)
-        LibName("BULLET", GetThirdpartyDir() + "bullet/lib/BulletDynamics" + suffix)
-        LibName("BULLET", GetThirdpartyDir() + "bullet/lib/BulletSoftBody" + suffix)
+        LibName("BULLET", thirdparty_dir + "bullet/lib/LinearMath" + suffix)
+        LibName("BULLET", thirdparty_dir + "bullet/lib/BulletCollision" + suffix)
+        LibName("BULLET", thirdparty_dir + "bullet/lib/BulletDynamics" + suffix)
+        LibName("BULLET", thirdparty_dir + "bullet/lib/BulletSoftBody" + suffix)
 
 if (COMPILER=="GCC"):
+    thirdparty_dir = GetThirdpartyDir()
     if GetTarget() != "darwin":
         PkgDisable("COCOA")
 
@@ -845,7 +857,7 @@ if (COMPILER=="GCC"):
     #if not PkgSkip("PYTHON"):
     #    IncDirectory("PYTHON", SDK["PYTHON"])
     if (GetHost() == "darwin"):
-        if (PkgSkip("FREETYPE")==0 and not os.path.isdir(GetThirdpartyDir() + 'freetype')):
+        if (PkgSkip("FREETYPE")==0 and not os.path.isdir(thirdparty_dir + 'freetype')):
             IncDirectory("FREETYPE", "/usr/X11/include")
             IncDirectory("FREETYPE", "/usr/X11/include/freetype2")
             LibDirectory("FREETYPE", "/usr/X11/lib")
@@ -910,22 +922,23 @@ if (COMPILER=="GCC"):
         PkgDisable("GL")
         PkgDisable("GLES")
         PkgDisable("TINYDISPLAY")
-        for pkg, empkg in {
-            'VORBIS': 'VORBIS',
-            'BULLET': 'BULLET',
-            'ZLIB': 'ZLIB',
-            'FREETYPE': 'FREETYPE',
-            'HARFBUZZ': 'HARFBUZZ',
-            'PNG': 'LIBPNG',
-        }.items():
+        for pkg, empkg in (
+            ('VORBIS', 'VORBIS'),
+            ('BULLET', 'BULLET'),
+            ('ZLIB', 'ZLIB'),
+            ('FREETYPE', 'FREETYPE'),
+            ('HARFBUZZ', 'HARFBUZZ'),
+            ('PNG', 'LIBPNG'),
+        ):
             if not PkgSkip(pkg):
-                LinkFlag(pkg, '-s USE_' + empkg + '=1')
-                CompileFlag(pkg, '-s USE_' + empkg + '=1')
+                flag = '-s USE_' + empkg + '=1'
+                LinkFlag(pkg, flag)
+                CompileFlag(pkg, flag)
 
     if not PkgSkip("FFMPEG"):
         if GetTarget() == "darwin":
             LibName("FFMPEG", "-framework VideoDecodeAcceleration")
-        elif os.path.isfile(GetThirdpartyDir() + "ffmpeg/lib/libavcodec.a"):
+        elif HasThirdpartyLib("ffmpeg", "libavcodec.a"):
             # Needed when linking ffmpeg statically on Linux.
             LibName("FFMPEG", "-Wl,-Bsymbolic")
             # Don't export ffmpeg symbols from libp3ffmpeg when linking statically.
@@ -935,15 +948,14 @@ if (COMPILER=="GCC"):
 
     if not PkgSkip("OPENEXR"):
         # OpenEXR libraries have different names depending on the version.
-        openexr_libdir = os.path.join(GetThirdpartyDir(), "openexr", "lib")
         openexr_incs = ("OpenEXR", "Imath", "OpenEXR/ImfOutputFile.h")
-        if os.path.isfile(os.path.join(openexr_libdir, "libOpenEXR-3_1.a")):
+        if HasThirdpartyLib("openexr", "libOpenEXR-3_1.a"):
             SmartPkgEnable("OPENEXR", "", ("OpenEXR-3_1", "IlmThread-3_1", "Imath-3_1", "Iex-3_1"), openexr_incs)
-        if os.path.isfile(os.path.join(openexr_libdir, "libOpenEXR-3_0.a")):
+        elif HasThirdpartyLib("openexr", "libOpenEXR-3_0.a"):
             SmartPkgEnable("OPENEXR", "", ("OpenEXR-3_0", "IlmThread-3_0", "Imath-3_0", "Iex-3_0"), openexr_incs)
-        elif os.path.isfile(os.path.join(openexr_libdir, "libOpenEXR.a")):
+        elif HasThirdpartyLib("openexr", "libOpenEXR.a"):
             SmartPkgEnable("OPENEXR", "", ("OpenEXR", "IlmThread", "Imath", "Iex"), openexr_incs)
-        elif os.path.isfile(os.path.join(openexr_libdir, "libIlmImf.a")):
+        elif HasThirdpartyLib("openexr", "libIlmImf.a"):
             SmartPkgEnable("OPENEXR", "", ("IlmImf", "Imath", "Half", "Iex", "IexMath", "IlmThread"), openexr_incs)
         else:
             # Find it in the system, preferably using pkg-config, otherwise
@@ -954,61 +966,24 @@ if (COMPILER=="GCC"):
         for fcollada_lib in fcollada_libs:
             LibName("FCOLLADA", "-Wl,--exclude-libs,lib%s.a" % (fcollada_lib))
 
-        if not PkgSkip("SWSCALE"):
-            LibName("SWSCALE", "-Wl,--exclude-libs,libswscale.a")
-
-        if not PkgSkip("SWRESAMPLE"):
-            LibName("SWRESAMPLE", "-Wl,--exclude-libs,libswresample.a")
-
-        if not PkgSkip("JPEG"):
-            LibName("JPEG", "-Wl,--exclude-libs,libjpeg.a")
-
-        if not PkgSkip("TIFF"):
-            LibName("TIFF", "-Wl,--exclude-libs,libtiff.a")
-
-        if not PkgSkip("PNG"):
-            LibName("PNG", "-Wl,--exclude-libs,libpng.a")
-            LibName("PNG", "-Wl,--exclude-libs,libpng16.a")
-
-        if not PkgSkip("SQUISH"):
-            LibName("SQUISH", "-Wl,--exclude-libs,libsquish.a")
-
-        if not PkgSkip("OPENEXR"):
-            LibName("OPENEXR", "-Wl,--exclude-libs,libHalf.a")
-            LibName("OPENEXR", "-Wl,--exclude-libs,libIex.a")
-            LibName("OPENEXR", "-Wl,--exclude-libs,libIexMath.a")
-            LibName("OPENEXR", "-Wl,--exclude-libs,libIlmImf.a")
-            LibName("OPENEXR", "-Wl,--exclude-libs,libIlmImfUtil.a")
-            LibName("OPENEXR", "-Wl,--exclude-libs,libIlmThread.a")
-            LibName("OPENEXR", "-Wl,--exclude-libs,libImath.a")
-            LibName("OPENEXR", "-Wl,--exclude-libs,libOpenEXR.a")
-            LibName("OPENEXR", "-Wl,--exclude-libs,libOpenEXRCore.a")
-            LibName("OPENEXR", "-Wl,--exclude-libs,libOpenEXRUtil.a")
-
-        if not PkgSkip("VORBIS"):
-            LibName("VORBIS", "-Wl,--exclude-libs,libogg.a")
-            LibName("VORBIS", "-Wl,--exclude-libs,libvorbis.a")
-            LibName("VORBIS", "-Wl,--exclude-libs,libvorbisenc.a")
-            LibName("VORBIS", "-Wl,--exclude-libs,libvorbisfile.a")
-
-        if not PkgSkip("OPUS"):
-            LibName("OPUS", "-Wl,--exclude-libs,libogg.a")
-            LibName("OPUS", "-Wl,--exclude-libs,libopus.a")
-            LibName("OPUS", "-Wl,--exclude-libs,libopusfile.a")
-
-        if not PkgSkip("VRPN"):
-            LibName("VRPN", "-Wl,--exclude-libs,libvrpn.a")
-            LibName("VRPN", "-Wl,--exclude-libs,libquat.a")
-
-        if not PkgSkip("ARTOOLKIT"):
-            LibName("ARTOOLKIT", "-Wl,--exclude-libs,libAR.a")
-            LibName("ARTOOLKIT", "-Wl,--exclude-libs,libARMulti.a")
-
-        if not PkgSkip("HARFBUZZ"):
-            LibName("HARFBUZZ", "-Wl,--exclude-libs,libharfbuzz.a")
-
-        if not PkgSkip("MIMALLOC"):
-            LibName("MIMALLOC", "-Wl,--exclude-libs,libmimalloc.a")
+        # Don't export the symbols of statically linked thirdparty libraries.
+        for pkg, libs in (("SWSCALE",    ("swscale",)),
+                          ("SWRESAMPLE", ("swresample",)),
+                          ("JPEG",       ("jpeg",)),
+                          ("TIFF",       ("tiff",)),
+                          ("PNG",        ("png", "png16")),
+                          ("SQUISH",     ("squish",)),
+                          ("OPENEXR",    ("Half", "Iex", "IexMath", "IlmImf", "IlmImfUtil", "IlmThread",
+                                          "Imath", "OpenEXR", "OpenEXRCore", "OpenEXRUtil")),
+                          ("VORBIS",     ("ogg", "vorbis", "vorbisenc", "vorbisfile")),
+                          ("OPUS",       ("ogg", "opus", "opusfile")),
+                          ("VRPN",       ("vrpn", "quat")),
+                          ("ARTOOLKIT",  ("AR", "ARMulti")),
+                          ("HARFBUZZ",   ("harfbuzz",)),
+                          ("MIMALLOC",   ("mimalloc",))):
+            if not PkgSkip(pkg):
+                for lib in libs:
+                    LibName(pkg, "-Wl,--exclude-libs,lib%s.a" % (lib))
 
     if PkgSkip("FFMPEG") or GetTarget() == "darwin":
         cv_lib = ChooseLib(("opencv_core", "cv"), "OPENCV")
@@ -1029,12 +1004,10 @@ if (COMPILER=="GCC"):
         elif GetTarget() != "emscripten":
             LibName("OPENAL", "-Wl,--exclude-libs,libopenal.a")
 
-    if not PkgSkip("ASSIMP") and \
-        os.path.isfile(GetThirdpartyDir() + "assimp/lib/libassimp.a"):
+    if not PkgSkip("ASSIMP") and HasThirdpartyLib("assimp", "libassimp.a"):
         # Also pick up IrrXML, which is needed when linking statically.
-        irrxml = GetThirdpartyDir() + "assimp/lib/libIrrXML.a"
-        if os.path.isfile(irrxml):
-            LibName("ASSIMP", irrxml)
+        if HasThirdpartyLib("assimp", "libIrrXML.a"):
+            LibName("ASSIMP", thirdparty_dir + "assimp/lib/libIrrXML.a")
 
             if GetTarget() not in ("darwin", "emscripten"):
                 LibName("ASSIMP", "-Wl,--exclude-libs,libassimp.a")
@@ -1049,7 +1022,7 @@ if (COMPILER=="GCC"):
             # Is there a cleaner way to check this?
             LinkFlag("PYTHON", "-s USE_BZIP2=1 -s USE_SQLITE3=1")
             if not PkgHasCustomLocation("PYTHON"):
-                python_libdir = GetThirdpartyDir() + "python/lib"
+                python_libdir = thirdparty_dir + "python/lib"
                 if os.path.isfile(python_libdir + "/libmpdec.a"):
                     LibName("PYTHON", python_libdir + "/libmpdec.a")
                 if os.path.isfile(python_libdir + "/libexpat.a"):
@@ -1204,18 +1177,18 @@ def printStatus(header,warnings):
         print("")
         print("-------------------------------------------------------------------")
         print(header)
-        tkeep = ""
-        tomit = ""
+        tkeep = []
+        tomit = []
         for x in PkgListGet():
             if PkgSkip(x):
-                tomit = tomit + x + " "
+                tomit.append(x)
             else:
-                tkeep = tkeep + x + " "
+                tkeep.append(x)
 
         print("Makepanda: Compiler: %s" % (COMPILER))
         print("Makepanda: Optimize: %d" % (GetOptimize()))
-        print("Makepanda: Keep Pkg: %s" % (tkeep))
-        print("Makepanda: Omit Pkg: %s" % (tomit))
+        print("Makepanda: Keep Pkg: %s" % (" ".join(tkeep)))
+        print("Makepanda: Omit Pkg: %s" % (" ".join(tomit)))
 
         if GENMAN:
             print("Makepanda: Generate API reference manual")
@@ -1243,9 +1216,7 @@ def printStatus(header,warnings):
 
 def BracketNameWithQuotes(name):
     # Workaround for OSX bug - compiler doesn't like those flags quoted.
-    if (name.startswith("-framework")): return name
-    if (name.startswith("-dylib_file")): return name
-    if (name.startswith("-undefined ")): return name
+    if name.startswith(("-framework", "-dylib_file", "-undefined ")): return name
 
     # Don't add quotes when it's not necessary.
     if " " not in name: return name
@@ -1260,110 +1231,138 @@ def BracketNameWithQuotes(name):
 ##
 ########################################################################
 
+# The /I and /D flags only depend on the opts, and a given opts list is shared
+# by many source files, so they are formatted once per distinct set of opts.
+# This is only used during the build, when INCDIRECTORIES and DEFSYMBOLS are
+# no longer being modified.
+MSVC_INCDEF_CACHE = {}
+
+def GetMsvcIncludeDefineFlags(opts):
+    key = tuple(opts)
+    flags = MSVC_INCDEF_CACHE.get(key)
+    if flags is None:
+        flags = ["/I" + BracketNameWithQuotes(dir) for (opt, dir) in INCDIRECTORIES if opt == "ALWAYS" or opt in opts]
+        flags += ["/D" + var + "=" + val for (opt, var, val) in DEFSYMBOLS if opt == "ALWAYS" or opt in opts]
+        # Drop repeated flags, such as an include directory shared by several
+        # packages.  Only the first occurrence has any effect.
+        flags = list(dict.fromkeys(flags))
+        MSVC_INCDEF_CACHE[key] = flags
+    return flags
+
+# Same for GCC, which also takes the framework directories and extra
+# compile flags that apply to these opts.
+GCC_INCDEF_CACHE = {}
+
+def GetGccIncludeDefineFlags(opts):
+    key = tuple(opts)
+    flags = GCC_INCDEF_CACHE.get(key)
+    if flags is None:
+        flags = ['-I' + BracketNameWithQuotes(dir) for (opt, dir) in INCDIRECTORIES if opt == "ALWAYS" or opt in opts]
+        flags += ['-F' + BracketNameWithQuotes(dir) for (opt, dir) in FRAMEWORKDIRECTORIES if opt == "ALWAYS" or opt in opts]
+        flags += ['-D' + var + '=' + val for (opt, var, val) in DEFSYMBOLS if opt == "ALWAYS" or opt in opts]
+        flags += [flag for (opt, flag) in COMPILEFLAGS if opt == "ALWAYS" or opt in opts]
+        flags = list(dict.fromkeys(flags))
+        GCC_INCDEF_CACHE[key] = flags
+    return flags
+
 def CompileCxx(obj,src,opts):
     ipath = GetListOption(opts, "DIR:")
     optlevel = GetOptimizeOption(opts)
     if (COMPILER=="MSVC"):
         if not BOOUSEINTELCOMPILER:
-            cmd = "cl "
+            parts = ["cl"]
             if GetTargetArch() == 'x64':
-                cmd += "/favor:blend "
-            cmd += "/wd4996 "
+                parts.append("/favor:blend")
+            parts.append("/wd4996")
 
             # Set the minimum version to Windows Vista.
-            cmd += "/DWINVER=0x600 "
+            parts.append("/DWINVER=0x600")
 
-            cmd += "/Fo" + obj + " /nologo /c"
+            parts += ["/Fo" + obj, "/nologo", "/c"]
             if GetTargetArch() == 'x86':
                 # x86 (32 bit) MSVC 2015+ defaults to /arch:SSE2
                 if not PkgSkip("SSE2") or 'SSE2' in opts:   # x86 with SSE2
-                    cmd += " /arch:SSE2"    # let's still be explicit and pass in /arch:SSE2
+                    parts.append("/arch:SSE2")    # let's still be explicit and pass in /arch:SSE2
                 else:                                       # x86 without SSE2
-                    cmd += " /arch:IA32"
-            for x in ipath: cmd += " /I" + x
-            for (opt,dir) in INCDIRECTORIES:
-                if (opt=="ALWAYS") or (opt in opts): cmd += " /I" + BracketNameWithQuotes(dir)
-            for (opt,var,val) in DEFSYMBOLS:
-                if (opt=="ALWAYS") or (opt in opts): cmd += " /D" + var + "=" + val
-            if (opts.count('MSFORSCOPE')): cmd += ' /Zc:forScope-'
-
-            if (optlevel==1): cmd += " /MDd /Zi /RTCs /GS"
-            if (optlevel==2): cmd += " /MDd /Zi"
-            if (optlevel==3): cmd += " /MD /Zi /GS- /O2 /fp:fast"
+                    parts.append("/arch:IA32")
+            parts.extend("/I" + x for x in ipath)
+            parts += GetMsvcIncludeDefineFlags(opts)
+            if 'MSFORSCOPE' in opts: parts.append('/Zc:forScope-')
+
+            if (optlevel==1): parts.append("/MDd /Zi /RTCs /GS")
+            if (optlevel==2): parts.append("/MDd /Zi")
+            if (optlevel==3): parts.append("/MD /Zi /GS- /O2 /fp:fast")
             if (optlevel==4):
-                cmd += " /MD /Zi /GS- /O2 /fp:fast /DFORCE_INLINING /DNDEBUG /GL"
-                cmd += " /Zp16"      # jean-claude add /Zp16 insures correct static alignment for SSEx
+                parts.append("/MD /Zi /GS- /O2 /fp:fast /DFORCE_INLINING /DNDEBUG /GL")
+                parts.append("/Zp16")      # jean-claude add /Zp16 insures correct static alignment for SSEx
 
-            cmd += " /Fd" + os.path.splitext(obj)[0] + ".pdb"
+            parts.append("/Fd" + os.path.splitext(obj)[0] + ".pdb")
 
             building = GetValueOption(opts, "BUILDING:")
             if (building):
-                cmd += " /DBUILDING_" + building
+                parts.append("/DBUILDING_" + building)
 
             if ("BIGOBJ" in opts) or GetTargetArch() == 'x64' or not PkgSkip("EIGEN"):
-                cmd += " /bigobj"
+                parts.append("/bigobj")
 
-            cmd += " /Zm300"
+            parts.append("/Zm300")
             if 'EXCEPTIONS' in opts:
-                cmd += " /EHsc"
+                parts.append("/EHsc")
             else:
-                cmd += " /D_HAS_EXCEPTIONS=0"
+                parts.append("/D_HAS_EXCEPTIONS=0")
 
             if 'RTTI' not in opts:
-                cmd += " /GR-"
+                parts.append("/GR-")
 
-            cmd += " /W3 " + BracketNameWithQuotes(src)
-            oscmd(cmd)
+            parts += ["/W3", BracketNameWithQuotes(src)]
+            oscmd(" ".join(parts))
         else:
-            cmd = "icl "
+            parts = ["icl"]
             if GetTargetArch() == 'x64':
-                cmd += "/favor:blend "
-            cmd += "/wd4996 /wd4267 /wd4101 "
-            cmd += "/DWINVER=0x600 "
-            cmd += "/Fo" + obj + " /c"
-            for x in ipath: cmd += " /I" + x
-            for (opt,dir) in INCDIRECTORIES:
-                if (opt=="ALWAYS") or (opt in opts): cmd += " /I" + BracketNameWithQuotes(dir)
-            for (opt,var,val) in DEFSYMBOLS:
-                if (opt=="ALWAYS") or (opt in opts): cmd += " /D" + var + "=" + val
-            if (opts.count('MSFORSCOPE')):  cmd += ' /Zc:forScope-'
-
-            if (optlevel==1): cmd += " /MDd /Zi /RTCs /GS"
-            if (optlevel==2): cmd += " /MDd /Zi /arch:SSE3"
+                parts.append("/favor:blend")
+            parts.append("/wd4996 /wd4267 /wd4101")
+            parts.append("/DWINVER=0x600")
+            parts += ["/Fo" + obj, "/c"]
+            parts.extend("/I" + x for x in ipath)
+            parts += GetMsvcIncludeDefineFlags(opts)
+            if 'MSFORSCOPE' in opts: parts.append('/Zc:forScope-')
+
+            if (optlevel==1): parts.append("/MDd /Zi /RTCs /GS")
+            if (optlevel==2): parts.append("/MDd /Zi /arch:SSE3")
             # core changes from jean-claude (dec 2011)
             # ----------------------------------------
             # performance will be seeked at level 3 & 4
             # -----------------------------------------
             if (optlevel==3):
-                cmd += " /MD /Zi /O2 /Oi /Ot /arch:SSE3"
-                cmd += " /Ob0"
-                cmd += " /Qipo-"                            # beware of IPO !!!
+                parts.append("/MD /Zi /O2 /Oi /Ot /arch:SSE3")
+                parts.append("/Ob0")
+                parts.append("/Qipo-")                            # beware of IPO !!!
             ##      Lesson learned: Don't use /GL flag -> end result is MESSY
             ## ----------------------------------------------------------------
             if (optlevel==4):
-                cmd += " /MD /Zi /O3 /Oi /Ot /Ob0 /Yc /DNDEBUG"  # /Ob0 a ete rajoute en cours de route a 47%
-                cmd += " /Qipo"                              # optimization multi file
+                parts.append("/MD /Zi /O3 /Oi /Ot /Ob0 /Yc /DNDEBUG")  # /Ob0 a ete rajoute en cours de route a 47%
+                parts.append("/Qipo")                              # optimization multi file
 
             # for 3 & 4 optimization levels
             # -----------------------------
             if (optlevel>=3):
-                cmd += " /fp:fast=2"
-                cmd += " /Qftz"
-                cmd += " /Qfp-speculation:fast"
-                cmd += " /Qopt-matmul"                        # needs /O2 or /O3
-                cmd += " /Qprec-div-"
-                cmd += " /Qsimd"
-
-                cmd += " /QxHost"                            # compile for target host; Compiling for distribs should probably strictly enforce /arch:..
-                cmd += " /Quse-intel-optimized-headers"        # use intel optimized headers
-                cmd += " /Qparallel"                        # enable parallelization
-                cmd += " /Qvc10"                                # for Microsoft Visual C++ 2010
+                parts.append("/fp:fast=2")
+                parts.append("/Qftz")
+                parts.append("/Qfp-speculation:fast")
+                parts.append("/Qopt-matmul")                        # needs /O2 or /O3
+                parts.append("/Qprec-div-")
+                parts.append("/Qsimd")
+
+                parts.append("/QxHost")                            # compile for target host; Compiling for distribs should probably strictly enforce /arch:..
+                parts.append("/Quse-intel-optimized-headers")        # use intel optimized headers
+                parts.append("/Qparallel")                        # enable parallelization
+                parts.append("/Qvc10")                                # for Microsoft Visual C++ 2010
 
             ## PCH files coexistence: the /Qpchi option causes the Intel C++ Compiler to name its
             ## PCH files with a .pchi filename suffix and reduce build time.
             ## The /Qpchi option is on by default but interferes with Microsoft libs; so use /Qpchi- to turn it off.
             ## I need to have a deeper look at this since the compile time is quite influenced by this setting !!!
-            cmd += " /Qpchi-"                                 # keep it this way!
+            parts.append("/Qpchi-")                                 # keep it this way!
 
             ## Inlining seems to be an issue here ! (the linker doesn't find necessary info later on)
             ## ------------------------------------
@@ -1380,177 +1379,173 @@ def CompileCxx(obj,src,opts):
             ## The compiler will issue an error if it encounters a pointer declaration before the class is defined.
             ## Alternate: #pragma pointers_to_members
 
-            cmd += " /Fd" + os.path.splitext(obj)[0] + ".pdb"
+            parts.append("/Fd" + os.path.splitext(obj)[0] + ".pdb")
             building = GetValueOption(opts, "BUILDING:")
-            if (building): cmd += " /DBUILDING_" + building
+            if (building): parts.append("/DBUILDING_" + building)
             if ("BIGOBJ" in opts) or GetTargetArch() == 'x64':
-                cmd += " /bigobj"
+                parts.append("/bigobj")
 
             # level of warnings and optimization reports
             if GetVerbose():
-                cmd += " /W3 " # or /W4 or /Wall
-                cmd += " /Qopt-report:2 /Qopt-report-phase:hlo /Qopt-report-phase:hpo"    # some optimization reports
+                parts.append("/W3") # or /W4 or /Wall
+                parts.append("/Qopt-report:2 /Qopt-report-phase:hlo /Qopt-report-phase:hpo")    # some optimization reports
             else:
-                cmd += " /W1 "
-            cmd += " /EHa /Zm300"
-            cmd += " " + BracketNameWithQuotes(src)
+                parts.append("/W1")
+            parts.append("/EHa /Zm300")
+            parts.append(BracketNameWithQuotes(src))
 
-            oscmd(cmd)
+            oscmd(" ".join(parts))
 
     if (COMPILER=="GCC"):
-        if (src.endswith(".c")): cmd = GetCC() +' -fPIC -c -o ' + obj
-        else:                    cmd = GetCXX()+' -std=gnu++11 -ftemplate-depth-70 -fPIC -c -o ' + obj
-        for (opt, dir) in INCDIRECTORIES:
-            if (opt=="ALWAYS") or (opt in opts): cmd += ' -I' + BracketNameWithQuotes(dir)
-        for (opt, dir) in FRAMEWORKDIRECTORIES:
-            if (opt=="ALWAYS") or (opt in opts): cmd += ' -F' + BracketNameWithQuotes(dir)
-        for (opt,var,val) in DEFSYMBOLS:
-            if (opt=="ALWAYS") or (opt in opts): cmd += ' -D' + var + '=' + val
-        for (opt,flag) in COMPILEFLAGS:
-            if (opt=="ALWAYS") or (opt in opts): cmd += ' ' + flag
-        for x in ipath: cmd += ' -I' + x
+        target = GetTarget()
+        arch = GetTargetArch()
+        cxx = GetCXX()
+        if (src.endswith(".c")): parts = [GetCC(), '-fPIC -c -o', obj]
+        else:                    parts = [cxx, '-std=gnu++11 -ftemplate-depth-70 -fPIC -c -o', obj]
+        parts += GetGccIncludeDefineFlags(opts)
+        for x in ipath: parts.append('-I' + x)
 
         if not GetLinkAllStatic() and 'NOHIDDEN' not in opts:
-            cmd += ' -fvisibility=hidden'
+            parts.append('-fvisibility=hidden')
 
         # Mac-specific flags.
-        if GetTarget() == "darwin":
-            cmd += " -Wno-deprecated-declarations"
-            if SDK.get("MACOSX"):
-                cmd += " -isysroot " + SDK["MACOSX"]
+        if target == "darwin":
+            parts.append("-Wno-deprecated-declarations")
+            macosx_sdk = SDK.get("MACOSX")
+            if macosx_sdk:
+                parts.append("-isysroot " + macosx_sdk)
 
             if tuple(OSX_ARCHS) == ('arm64',):
-                cmd += " -mmacosx-version-min=11.0"
+                parts.append("-mmacosx-version-min=11.0")
             else:
-                cmd += " -mmacosx-version-min=10.9"
+                parts.append("-mmacosx-version-min=10.9")
 
             # Use libc++ to enable C++11 features.
-            cmd += " -stdlib=libc++"
+            parts.append("-stdlib=libc++")
 
-            for arch in OSX_ARCHS:
-                if 'NOARCH:' + arch.upper() not in opts:
-                    cmd += " -arch %s" % arch
+            for osx_arch in OSX_ARCHS:
+                if 'NOARCH:' + osx_arch.upper() not in opts:
+                    parts.append("-arch %s" % osx_arch)
 
-        elif 'clang' not in GetCXX().split('/')[-1] and GetCXX() != 'em++':
+        elif 'clang' not in cxx.split('/')[-1] and cxx != 'em++':
             # Enable interprocedural optimizations in GCC.
-            cmd += " -fno-semantic-interposition"
+            parts.append("-fno-semantic-interposition")
 
         if "SYSROOT" in SDK:
-            if GetTarget() != "android":
-                cmd += ' --sysroot=%s' % (SDK["SYSROOT"])
-            cmd += ' -no-canonical-prefixes'
+            if target != "android":
+                parts.append('--sysroot=%s' % (SDK["SYSROOT"]))
+            parts.append('-no-canonical-prefixes')
 
         # Android-specific flags.
-        arch = GetTargetArch()
-
-        if GetTarget() == "android":
+        if target == "android":
             # Most of the specific optimization flags here were
             # just copied from the default Android Makefiles.
             if "ANDROID_GCC_TOOLCHAIN" in SDK:
-                cmd += ' -gcc-toolchain ' + SDK["ANDROID_GCC_TOOLCHAIN"].replace('\\', '/')
-            cmd += ' -ffunction-sections -funwind-tables'
-            cmd += ' -target ' + SDK["ANDROID_TRIPLE"]
+                parts.append('-gcc-toolchain ' + SDK["ANDROID_GCC_TOOLCHAIN"].replace('\\', '/'))
+            parts.append('-ffunction-sections -funwind-tables')
+            parts.append('-target ' + SDK["ANDROID_TRIPLE"])
             if arch == 'armv7a':
-                cmd += ' -march=armv7-a -mfloat-abi=softfp -mfpu=vfpv3-d16'
+                parts.append('-march=armv7-a -mfloat-abi=softfp -mfpu=vfpv3-d16')
             elif arch == 'arm':
-                cmd += ' -march=armv5te -mtune=xscale -msoft-float'
+                parts.append('-march=armv5te -mtune=xscale -msoft-float')
             elif arch == 'mips':
-                cmd += ' -mips32'
+                parts.append('-mips32')
             elif arch == 'mips64':
-                cmd += ' -fintegrated-as'
+                parts.append('-fintegrated-as')
             elif arch == 'x86':
-                cmd += ' -march=i686 -mssse3 -mfpmath=sse -m32'
-                cmd += ' -mstackrealign'
+                parts.append('-march=i686 -mssse3 -mfpmath=sse -m32')
+                parts.append('-mstackrealign')
             elif arch == 'x86_64':
-                cmd += ' -march=x86-64 -msse4.2 -mpopcnt -m64'
+                parts.append('-march=x86-64 -msse4.2 -mpopcnt -m64')
 
-            cmd += " -Wa,--noexecstack"
+            parts.append("-Wa,--noexecstack")
 
-            # Do we want thumb or arm instructions?
             if arch != 'arm64' and arch.startswith('arm'):
+                # Do we want thumb or arm instructions?
                 if optlevel >= 3:
-                    cmd += ' -mthumb'
+                    parts.append('-mthumb')
                 else:
-                    cmd += ' -marm'
+                    parts.append('-marm')
 
-            # Enable SIMD instructions if requested
-            if arch != 'arm64' and arch.startswith('arm') and PkgSkip("NEON") == 0:
-                cmd += ' -mfpu=neon'
+                # Enable SIMD instructions if requested
+                if PkgSkip("NEON") == 0:
+                    parts.append('-mfpu=neon')
 
-        elif GetTarget() == 'emscripten':
+        elif target == 'emscripten':
             if GetOptimize() <= 1:
-                cmd += " -s ASSERTIONS=2"
+                parts.append("-s ASSERTIONS=2")
             elif GetOptimize() <= 2:
-                cmd += " -s ASSERTIONS=1"
+                parts.append("-s ASSERTIONS=1")
 
         else:
-            cmd += " -pthread"
+            parts.append("-pthread")
 
         if not src.endswith(".c"):
             # We don't use exceptions for most modules.
             if 'EXCEPTIONS' in opts:
-                cmd += " -fexceptions"
+                parts.append("-fexceptions")
             else:
-                cmd += " -fno-exceptions"
-                if GetTarget() == 'emscripten':
-                    cmd += " -s DISABLE_EXCEPTION_CATCHING=1"
+                parts.append("-fno-exceptions")
+                if target == 'emscripten':
+                    parts.append("-s DISABLE_EXCEPTION_CATCHING=1")
 
                 if src.endswith(".mm"):
                     # Work around Apple compiler bug.
-                    cmd += " -U__EXCEPTIONS"
+                    parts.append("-U__EXCEPTIONS")
 
-            target = GetTarget()
             if 'RTTI' not in opts and target != "darwin":
                 # We always disable RTTI on Android for memory usage reasons.
                 if optlevel >= 4 or target == "android":
-                    cmd += " -fno-rtti"
+                    parts.append("-fno-rtti")
 
-        if ('SSE2' in opts or not PkgSkip("SSE2")) and not arch.startswith("arm") and arch != 'aarch64':
-            if GetTarget() != "emscripten":
-                cmd += " -msse2"
+        if target != "emscripten" and not arch.startswith("arm") and arch != 'aarch64':
+            if 'SSE2' in opts or not PkgSkip("SSE2"):
+                parts.append("-msse2")
 
         # Needed by both Python, Panda, Eigen, all of which break aliasing rules.
-        cmd += " -fno-strict-aliasing"
+        parts.append("-fno-strict-aliasing")
+
+        # Pass the assembly to the assembler through a pipe, not a temp file.
+        if target != "emscripten":
+            parts.append("-pipe")
 
         # Certain clang versions crash when passing these math flags while
         # compiling Objective-C++ code
         if not src.endswith(".m") and not src.endswith(".mm"):
             if optlevel >= 3:
-                cmd += " -ffast-math -fno-stack-protector"
+                parts.append("-ffast-math -fno-stack-protector")
             if optlevel == 3:
                 # Fast math is nice, but we'd like to see NaN in dev builds.
-                cmd += " -fno-finite-math-only"
+                parts.append("-fno-finite-math-only")
 
             # Make sure this is off to avoid GCC/Eigen bug (see GitHub #228)
-            if GetTarget() != "emscripten":
-                cmd += " -fno-unsafe-math-optimizations"
+            if target != "emscripten":
+                parts.append("-fno-unsafe-math-optimizations")
 
         if (optlevel==1):
-            if GetTarget() == "emscripten":
-                cmd += " -g -D_DEBUG"
+            if target == "emscripten":
+                parts.append("-g -D_DEBUG")
             else:
-                cmd += " -ggdb -D_DEBUG"
-        if (optlevel==2): cmd += " -O1 -D_DEBUG"
-        if (optlevel==3): cmd += " -O2"
-        if (optlevel==4): cmd += " -O3 -DNDEBUG"
+                parts.append("-ggdb -D_DEBUG")
+        if (optlevel==2): parts.append("-O1 -D_DEBUG")
+        if (optlevel==3): parts.append("-O2")
+        if (optlevel==4): parts.append("-O3 -DNDEBUG")
 
         # Enable more warnings.
-        cmd += " -Wall -Wno-unused-function -Werror=return-type"
+        parts.append("-Wall -Wno-unused-function -Werror=return-type")
 
         # Ignore unused variables in NDEBUG builds, often used in asserts.
         if optlevel == 4:
-            cmd += " -Wno-unused-variable"
+            parts.append("-Wno-unused-variable")
 
-        if src.endswith(".c"):
-            cmd += ' ' + CFLAGS
-        else:
-            cmd += ' ' + CXXFLAGS
-        cmd = cmd.rstrip()
+        extra_flags = (CFLAGS if src.endswith(".c") else CXXFLAGS).rstrip()
+        if extra_flags:
+            parts.append(extra_flags)
 
         building = GetValueOption(opts, "BUILDING:")
-        if (building): cmd += " -DBUILDING_" + building
-        cmd += ' ' + BracketNameWithQuotes(src)
-        oscmd(cmd)
+        if (building): parts.append("-DBUILDING_" + building)
+        parts.append(BracketNameWithQuotes(src))
+        oscmd(" ".join(parts))
 
 ########################################################################
 ##
@@ -1577,8 +1572,8 @@ def CompileBison(wobj, wsrc, opts):
             exit('Could not find bison!')
     else:
         oscmd(bison + ' -y -d -o'+GetOutputDir()+'/tmp/'+ifile+'.c -p '+pre+' '+wsrc)
-        CopyFile(wdstc, GetOutputDir()+"/tmp/"+ifile+".c")
-        CopyFile(wdsth, GetOutputDir()+"/tmp/"+ifile+".h")
+        ConditionalCopyFile(wdstc, GetOutputDir()+"/tmp/"+ifile+".c")
+        ConditionalCopyFile(wdsth, GetOutputDir()+"/tmp/"+ifile+".h")
 
     # Finally, compile the generated source file.
     CompileCxx(wobj, wdstc, opts + ["FLEX"])
@@ -1593,7 +1588,7 @@ def CompileFlex(wobj,wsrc,opts):
     ifile = os.path.basename(wsrc)
     wdst = GetOutputDir()+"/tmp/"+ifile+".cxx"
     pre = GetValueOption(opts, "BISONPREFIX_")
-    dashi = opts.count("FLEXDASHI")
+    dashi = "FLEXDASHI" in opts
     flex = GetFlex()
     want_version = GetValueOption(opts, "FLEXVERSION:")
     if flex and want_version:
@@ -1616,10 +1611,14 @@ def CompileFlex(wobj,wsrc,opts):
         else:
             exit('Could not find flex!')
     else:
+        # Generate into a scratch file first, so that the output is left
+        # alone if flex produced the same contents as last time.
+        wtmp = GetOutputDir()+"/tmp/"+ifile+".c"
         if (dashi):
-            oscmd(flex + " -i -P" + pre + " -o"+wdst+" "+wsrc)
+            oscmd(flex + " -i -P" + pre + " -o"+wtmp+" "+wsrc)
         else:
-            oscmd(flex +    " -P" + pre + " -o"+wdst+" "+wsrc)
+            oscmd(flex +    " -P" + pre + " -o"+wtmp+" "+wsrc)
+        ConditionalCopyFile(wdst, wtmp)
 
     # Finally, compile the generated source file.
     CompileCxx(wobj, wdst, opts + ["FLEX"])
@@ -1692,24 +1691,20 @@ def CompileIgate(woutd,wsrc,opts):
     cmd += ' -S' + GetOutputDir() + '/include/parser-inc'
 
     # Add -I, -S and -D flags
-    for x in ipath:
-        cmd += ' -I' + BracketNameWithQuotes(x)
-    for (opt,dir) in INCDIRECTORIES:
-        if (opt=="ALWAYS") or (opt in opts):
-            cmd += ' -S' + BracketNameWithQuotes(dir)
-    for (opt,var,val) in DEFSYMBOLS:
-        if (opt=="ALWAYS") or (opt in opts):
-            cmd += ' -D' + var + '=' + val
+    parts = [cmd]
+    parts += ['-I' + BracketNameWithQuotes(x) for x in ipath]
+    parts += ['-S' + BracketNameWithQuotes(dir) for (opt, dir) in INCDIRECTORIES if opt == "ALWAYS" or opt in opts]
+    parts += ['-D' + var + '=' + val for (opt, var, val) in DEFSYMBOLS if opt == "ALWAYS" or opt in opts]
 
     #building = GetValueOption(opts, "BUILDING:")
-    #if (building): cmd += " -DBUILDING_"+building
-    cmd += ' -module ' + module + ' -library ' + library
+    #if (building): parts.append("-DBUILDING_"+building)
+    parts += ['-module', module, '-library', library]
     for x in wsrc:
         if (x.startswith("/")):
-            cmd += ' ' + BracketNameWithQuotes(x)
+            parts.append(BracketNameWithQuotes(x))
         else:
-            cmd += ' ' + BracketNameWithQuotes(os.path.basename(x))
-    oscmd(cmd)
+            parts.append(BracketNameWithQuotes(os.path.basename(x)))
+    oscmd(' '.join(parts))
 
 ########################################################################
 ##
@@ -1776,18 +1771,18 @@ def CompileLib(lib, obj, opts):
             oscmd(cmd)
 
     if (COMPILER=="GCC"):
+        # Both of these also write the symbol index, so that we don't need
+        # to run ranlib on the archive afterwards.
         if GetTarget() == 'darwin':
             cmd = 'libtool -static -o ' + BracketNameWithQuotes(lib)
         else:
-            cmd = GetAR() + ' cru ' + BracketNameWithQuotes(lib)
+            cmd = GetAR() + ' crus ' + BracketNameWithQuotes(lib)
         for x in obj:
             if GetLinkAllStatic() and x.endswith('.a'):
                 continue
             cmd += ' ' + BracketNameWithQuotes(x)
         oscmd(cmd)
 
-        oscmd(GetRanlib() + ' ' + BracketNameWithQuotes(lib))
-
 ########################################################################
 ##
 ## CompileLink
@@ -1795,6 +1790,10 @@ def CompileLib(lib, obj, opts):
 ########################################################################
 
 def CompileLink(dll, obj, opts):
+    # The option tables below are scanned once per link; putting "ALWAYS" in
+    # the set lets each entry be tested with a single hash lookup.
+    optset = frozenset(opts) | {"ALWAYS"}
+
     if (COMPILER=="MSVC"):
         if not BOOUSEINTELCOMPILER:
             cmd = "link /nologo "
@@ -1809,7 +1808,9 @@ def CompileLink(dll, obj, opts):
             if (optlevel==1): cmd += " /MAP /MAPINFO:EXPORTS /NOD:MSVCRT.LIB /NOD:MSVCPRT.LIB /NOD:MSVCIRT.LIB"
             if (optlevel==2): cmd += " /MAP:NUL /NOD:MSVCRT.LIB /NOD:MSVCPRT.LIB /NOD:MSVCIRT.LIB"
             if (optlevel==3): cmd += " /MAP:NUL /NOD:MSVCRTD.LIB /NOD:MSVCPRTD.LIB /NOD:MSVCIRTD.LIB"
-            if (optlevel==4): cmd += " /MAP:NUL /LTCG /NOD:MSVCRTD.LIB /NOD:MSVCPRTD.LIB /NOD:MSVCIRTD.LIB"
+            # Incremental LTCG only regenerates code for the modules that changed
+            # since the previous link, and is otherwise equivalent to /LTCG.
+            if (optlevel==4): cmd += " /MAP:NUL /LTCG:INCREMENTAL /NOD:MSVCRTD.LIB /NOD:MSVCPRTD.LIB /NOD:MSVCIRTD.LIB"
             if ("MFC" in opts):
                 if (optlevel<=2): cmd += " /NOD:MSVCRTD.LIB mfcs100d.lib MSVCRTD.lib"
                 else: cmd += " /NOD:MSVCRT.LIB mfcs100.lib MSVCRT.lib"
@@ -1836,31 +1837,38 @@ def CompileLink(dll, obj, opts):
             if dll.endswith(".dll") or dll.endswith(".pyd"):
                 cmd += ' /IMPLIB:' + GetOutputDir() + '/lib/' + os.path.splitext(os.path.basename(dll))[0] + ".lib"
 
-            for (opt, dir) in LIBDIRECTORIES:
-                if (opt=="ALWAYS") or (opt in opts):
-                    cmd += ' /LIBPATH:' + BracketNameWithQuotes(dir)
+            # The same directory is often listed for several packages.
+            for dir in dict.fromkeys(dir for (opt, dir) in LIBDIRECTORIES if opt in optset):
+                cmd += ' /LIBPATH:' + BracketNameWithQuotes(dir)
 
+            # The inputs are passed in a response file, since the list of
+            # objects and libraries can exceed the command-line length limit.
+            inputs = []
             for x in obj:
                 if x.endswith(".dll") or x.endswith(".pyd"):
-                    cmd += ' ' + GetOutputDir() + '/lib/' + os.path.splitext(os.path.basename(x))[0] + ".lib"
+                    inputs.append(GetOutputDir() + '/lib/' + os.path.splitext(os.path.basename(x))[0] + ".lib")
                 elif x.endswith(".lib"):
                     dname = os.path.splitext(os.path.basename(x))[0] + ".dll"
                     if (GetOrigExt(x) != ".ilb" and os.path.exists(GetOutputDir()+"/bin/" + dname)):
                         exit("Error: in makepanda, specify "+dname+", not "+x)
-                    cmd += ' ' + BracketNameWithQuotes(x)
+                    inputs.append(BracketNameWithQuotes(x))
                 elif x.endswith(".def"):
-                    cmd += ' /DEF:' + BracketNameWithQuotes(x)
+                    inputs.append('/DEF:' + BracketNameWithQuotes(x))
                 elif x.endswith(".dat"):
                     pass
                 else:
-                    cmd += ' ' + BracketNameWithQuotes(x)
+                    inputs.append(BracketNameWithQuotes(x))
 
             if (GetOrigExt(dll)==".exe" and "NOICON" not in opts):
-                cmd += " " + GetOutputDir() + "/tmp/pandaIcon.res"
+                inputs.append(GetOutputDir() + "/tmp/pandaIcon.res")
 
             for (opt, name) in LIBNAMES:
-                if (opt=="ALWAYS") or (opt in opts):
-                    cmd += " " + BracketNameWithQuotes(name)
+                if opt in optset:
+                    inputs.append(BracketNameWithQuotes(name))
+
+            rspfile = GetOutputDir() + "/tmp/" + os.path.relpath(dll, GetOutputDir()).replace("\\", "_").replace("/", "_") + ".rsp"
+            WriteFile(rspfile, "\n".join(inputs) + "\n")
+            cmd += ' @' + BracketNameWithQuotes(rspfile)
 
             oscmd(cmd)
         else:
@@ -1894,9 +1902,9 @@ def CompileLink(dll, obj, opts):
             if dll.endswith(".dll"):
                 cmd += ' /IMPLIB:' + GetOutputDir() + '/lib/' + os.path.splitext(os.path.basename(dll))[0] + ".lib"
 
-            for (opt, dir) in LIBDIRECTORIES:
-                if (opt=="ALWAYS") or (opt in opts):
-                    cmd += ' /LIBPATH:' + BracketNameWithQuotes(dir)
+            # The same directory is often listed for several packages.
+            for dir in dict.fromkeys(dir for (opt, dir) in LIBDIRECTORIES if opt in optset):
+                cmd += ' /LIBPATH:' + BracketNameWithQuotes(dir)
 
             for x in obj:
                 if x.endswith(".dll") or x.endswith(".pyd"):
@@ -1917,7 +1925,7 @@ def CompileLink(dll, obj, opts):
                 cmd += " " + GetOutputDir() + "/tmp/pandaIcon.res"
 
             for (opt, name) in LIBNAMES:
-                if (opt=="ALWAYS") or (opt in opts):
+                if opt in optset:
                     cmd += " " + BracketNameWithQuotes(name)
 
             oscmd(cmd)
@@ -1963,8 +1971,9 @@ def CompileLink(dll, obj, opts):
         # macOS specific flags.
         if GetTarget() == 'darwin':
             cmd += " -headerpad_max_install_names"
-            if SDK.get("MACOSX"):
-                cmd += " -isysroot " + SDK["MACOSX"] + " -Wl,-syslibroot," + SDK["MACOSX"]
+            macosx_sdk = SDK.get("MACOSX")
+            if macosx_sdk:
+                cmd += " -isysroot " + macosx_sdk + " -Wl,-syslibroot," + macosx_sdk
 
             if tuple(OSX_ARCHS) == ('arm64',):
                 cmd += " -mmacosx-version-min=11.0"
@@ -2008,19 +2017,19 @@ def CompileLink(dll, obj, opts):
         if "PYTHON" in opts and GetOrigExt(dll) != ".exe" and GetTarget() != 'android':
             opts = opts[:]
             opts.remove("PYTHON")
+            optset = optset - {"PYTHON"}
 
-        for (opt, dir) in LIBDIRECTORIES:
-            if (opt=="ALWAYS") or (opt in opts):
-                cmd += ' -L' + BracketNameWithQuotes(dir)
-        for (opt, dir) in FRAMEWORKDIRECTORIES:
-            if (opt=="ALWAYS") or (opt in opts):
-                cmd += ' -F' + BracketNameWithQuotes(dir)
+        # The same directory is often listed for several packages.
+        for dir in dict.fromkeys(dir for (opt, dir) in LIBDIRECTORIES if opt in optset):
+            cmd += ' -L' + BracketNameWithQuotes(dir)
+        for dir in dict.fromkeys(dir for (opt, dir) in FRAMEWORKDIRECTORIES if opt in optset):
+            cmd += ' -F' + BracketNameWithQuotes(dir)
         if GetOrigExt(dll) == ".exe" or GetTarget() != 'emscripten':
             for (opt, name) in LIBNAMES:
-                if (opt=="ALWAYS") or (opt in opts):
+                if opt in optset:
                     cmd += ' ' + BracketNameWithQuotes(name)
         for (opt, flag) in LINKFLAGS:
-            if (opt=="ALWAYS") or (opt in opts):
+            if opt in optset:
                 cmd += ' ' + flag
 
         if GetTarget() not in ('freebsd', 'emscripten'):
@@ -2037,19 +2046,19 @@ def CompileLink(dll, obj, opts):
         if GetOptimizeOption(opts) == 4 and GetTarget() in ('linux', 'android'):
             oscmd(GetStrip() + " --strip-unneeded " + BracketNameWithQuotes(dll))
 
-        os.system("chmod +x " + BracketNameWithQuotes(dll))
+        os.chmod(dll, os.stat(dll).st_mode | 0o111)
 
         if dll.endswith("." + MAJOR_VERSION + ".dylib"):
             newdll = dll[:-6-len(MAJOR_VERSION)] + "dylib"
-            if os.path.isfile(newdll):
+            if os.path.lexists(newdll):
                 os.remove(newdll)
-            oscmd("ln -s " + BracketNameWithQuotes(os.path.basename(dll)) + " " + BracketNameWithQuotes(newdll))
+            os.symlink(os.path.basename(dll), newdll)
 
         elif dll.endswith("." + MAJOR_VERSION):
             newdll = dll[:-len(MAJOR_VERSION)-1]
-            if os.path.isfile(newdll):
+            if os.path.lexists(newdll):
                 os.remove(newdll)
-            oscmd("ln -s " + BracketNameWithQuotes(os.path.basename(dll)) + " " + BracketNameWithQuotes(newdll))
+            os.symlink(os.path.basename(dll), newdll)
 
 ##########################################################################################
 #
@@ -2085,7 +2094,12 @@ def CompileEgg(eggfile, src, opts):
 
     if pz:
         if zlib:
-            WriteBinaryFile(eggfile + '.pz', zlib.compress(ReadBinaryFile(eggfile)))
+            # Compress the egg in chunks rather than loading it into memory.
+            compressor = zlib.compressobj()
+            with open(eggfile, 'rb') as fin, open(eggfile + '.pz', 'wb') as fout:
+                for chunk in iter(lambda: fin.read(1 << 20), b''):
+                    fout.write(compressor.compress(chunk))
+                fout.write(compressor.flush())
             os.remove(eggfile)
         else:
             oscmd(pzip + ' ' + BracketNameWithQuotes(eggfile))
@@ -2127,27 +2141,21 @@ def CompileRes(target, src, opts):
 def CompileRsrc(target, src, opts):
     """Compiles a Mac OS .r file into an .rsrc file."""
     ipath = GetListOption(opts, "DIR:")
-    if os.path.isfile("/usr/bin/Rez"):
-        cmd = "Rez -useDF"
-    elif os.path.isfile("/Library/Developer/CommandLineTools/usr/bin/Rez"):
-        cmd = "/Library/Developer/CommandLineTools/usr/bin/Rez -useDF"
-    else:
-        cmd = "/Developer/Tools/Rez -useDF"
-    cmd += " -o " + BracketNameWithQuotes(target)
+    parts = [GetRez(), "-useDF", "-o", BracketNameWithQuotes(target)]
     for x in ipath:
-        cmd += " -i " + x
+        parts += ["-i", x]
     for (opt,dir) in INCDIRECTORIES:
         if (opt=="ALWAYS") or (opt in opts):
-            cmd += " -i " + BracketNameWithQuotes(dir)
+            parts += ["-i", BracketNameWithQuotes(dir)]
     for (opt,var,val) in DEFSYMBOLS:
         if (opt=="ALWAYS") or (opt in opts):
             if (val == ""):
-                cmd += " -d " + var
+                parts += ["-d", var]
             else:
-                cmd += " -d " + var + " = " + val
+                parts += ["-d", var, "=", val]
 
-    cmd += " " + BracketNameWithQuotes(src)
-    oscmd(cmd)
+    parts.append(BracketNameWithQuotes(src))
+    oscmd(" ".join(parts))
 
 ##########################################################################################
 #
@@ -2158,17 +2166,17 @@ def CompileRsrc(target, src, opts):
 def CompileJava(target, src, opts):
     """Compiles a .java file into a .class file."""
     if GetHost() == 'android':
-        cmd = "ecj "
+        cmd = ["ecj"]
     else:
-        cmd = "javac -bootclasspath " + BracketNameWithQuotes(SDK["ANDROID_JAR"]) + " "
+        cmd = ["javac", "-bootclasspath", SDK["ANDROID_JAR"]]
 
     optlevel = GetOptimizeOption(opts)
     if optlevel >= 4:
-        cmd += "-debug:none "
+        cmd.append("-debug:none")
 
-    cmd += "-cp " + GetOutputDir() + "/classes "
-    cmd += "-d " + GetOutputDir() + "/classes "
-    cmd += BracketNameWithQuotes(src)
+    cmd += ["-cp", GetOutputDir() + "/classes"]
+    cmd += ["-d", GetOutputDir() + "/classes"]
+    cmd.append(src)
     oscmd(cmd)
 
 ##########################################################################################
@@ -2180,13 +2188,11 @@ def CompileJava(target, src, opts):
 def FreezePy(target, inputs, opts):
     assert len(inputs) > 0
 
-    cmdstr = BracketNameWithQuotes(SDK["PYTHONEXEC"].replace('\\', '/')) + " "
-    cmdstr += "-B "
-
-    cmdstr += os.path.join(GetOutputDir(), "direct", "dist", "pfreeze.py")
+    parts = [SDK["PYTHONEXEC"].replace('\\', '/'), "-B"]
+    parts.append(os.path.join(GetOutputDir(), "direct", "dist", "pfreeze.py"))
 
     if 'FREEZE_STARTUP' in opts:
-        cmdstr += " -s"
+        parts.append("-s")
 
     if GetOrigExt(target) == '.exe':
         src = inputs.pop(0)
@@ -2200,15 +2206,18 @@ def FreezePy(target, inputs, opts):
         if i.startswith('direct.src'):
             i = i.replace('.src.', '.')
 
-        cmdstr += " -i " + i
+        parts += ["-i", i]
 
-    cmdstr += " -o " + target + " " + src
+    parts += ["-o", target]
+    if src:
+        parts.append(src)
 
+    # Pass the variable only to this process, since other build threads
+    # share os.environ.
+    env = None
     if ("LINK_PYTHON_STATIC" in opts):
-        os.environ["LINK_PYTHON_STATIC"] = "1"
-    oscmd(cmdstr)
-    if ("LINK_PYTHON_STATIC" in os.environ):
-        del os.environ["LINK_PYTHON_STATIC"]
+        env = dict(os.environ, LINK_PYTHON_STATIC="1")
+    oscmd(parts, env=env)
 
     if (not os.path.exists(target)):
         exit("FREEZER_ERROR")
@@ -2239,19 +2248,25 @@ def CompileBundle(target, inputs, opts):
     # Now link the object files to form the bundle.
     if plist is None:
         exit("One plist file must be used when creating a bundle!")
-    bundleName = plistlib.load(open(plist, 'rb'))["CFBundleExecutable"]
+    import plistlib
+    with open(plist, 'rb') as fp:
+        bundleName = plistlib.load(fp)["CFBundleExecutable"]
 
-    oscmd("rm -rf %s" % target)
-    oscmd("mkdir -p %s/Contents/MacOS/" % target)
-    oscmd("mkdir -p %s/Contents/Resources/" % target)
+    if os.path.lexists(target):
+        try:
+            shutil.rmtree(target)
+        except OSError as ex:
+            exit("Cannot remove %s: %s" % (target, ex))
+    os.makedirs(target + "/Contents/MacOS/")
+    os.makedirs(target + "/Contents/Resources/")
     if target.endswith(".app"):
         SetOrigExt("%s/Contents/MacOS/%s" % (target, bundleName), ".exe")
     else:
         SetOrigExt("%s/Contents/MacOS/%s" % (target, bundleName), ".dll")
     CompileLink("%s/Contents/MacOS/%s" % (target, bundleName), objects, opts + ["BUNDLE"])
-    oscmd("cp %s %s/Contents/Info.plist" % (plist, target))
+    shutil.copy(plist, target + "/Contents/Info.plist")
     for r in resources:
-        oscmd("cp %s %s/Contents/Resources/" % (r, target))
+        shutil.copy(r, target + "/Contents/Resources/")
 
 ##########################################################################################
 #
@@ -2262,16 +2277,12 @@ def CompileBundle(target, inputs, opts):
 def CompileMIDL(target, src, opts):
     ipath = GetListOption(opts, "DIR:")
     if (COMPILER=="MSVC"):
-        cmd = "midl"
-        cmd += " /out" + BracketNameWithQuotes(os.path.dirname(target))
-        for x in ipath: cmd += " /I" + x
-        for (opt,dir) in INCDIRECTORIES:
-            if (opt=="ALWAYS") or (opt in opts): cmd += " /I" + BracketNameWithQuotes(dir)
-        for (opt,var,val) in DEFSYMBOLS:
-            if (opt=="ALWAYS") or (opt in opts): cmd += " /D" + var + "=" + val
-        cmd += " " + BracketNameWithQuotes(src)
+        parts = ["midl", "/out" + BracketNameWithQuotes(os.path.dirname(target))]
+        parts += ["/I" + x for x in ipath]
+        parts += GetMsvcIncludeDefineFlags(opts)
+        parts.append(BracketNameWithQuotes(src))
 
-        oscmd(cmd)
+        oscmd(" ".join(parts))
 
 ##########################################################################################
 #
@@ -2280,23 +2291,22 @@ def CompileMIDL(target, src, opts):
 ##########################################################################################
 
 def CompileDalvik(target, inputs, opts):
-    cmd = "d8 --output " + os.path.dirname(target)
+    parts = ["d8", "--output", os.path.dirname(target)]
 
     if GetOptimize() <= 2:
-        cmd += " --debug"
+        parts.append("--debug")
     else:
-        cmd += " --release"
+        parts.append("--release")
 
     if "ANDROID_API" in SDK:
-        cmd += " --min-api %d" % (SDK["ANDROID_API"])
+        parts += ["--min-api", "%d" % (SDK["ANDROID_API"])]
 
     if "ANDROID_JAR" in SDK:
-        cmd += " --lib %s" % (SDK["ANDROID_JAR"])
+        parts += ["--lib", SDK["ANDROID_JAR"]]
 
-    for i in inputs:
-        cmd += " " + BracketNameWithQuotes(i)
+    parts += inputs
 
-    oscmd(cmd)
+    oscmd(parts)
 
 ##########################################################################################
 #
@@ -2304,8 +2314,20 @@ def CompileDalvik(target, inputs, opts):
 #
 ##########################################################################################
 
+# Maps the extension of a source file to the progress message and function
+# used to compile it into an .obj file.
+OBJ_COMPILERS = {
+    ".cxx": ("Building C++ object", CompileCxx),
+    ".c": ("Building C object", CompileCxx),
+    ".mm": ("Building Objective-C++ object", CompileCxx),
+    ".yxx": ("Building Bison object", CompileBison),
+    ".lxx": ("Building Flex object", CompileFlex),
+    ".rc": ("Building resource object", CompileRes),
+    ".r": ("Building resource object", CompileRsrc),
+}
+
 def CompileAnything(target, inputs, opts, progress = None):
-    if opts.count("DEPENDENCYONLY"):
+    if "DEPENDENCYONLY" in opts:
         return
     if len(inputs) == 0:
         exit("No input files for target "+target)
@@ -2313,11 +2335,13 @@ def CompileAnything(target, inputs, opts, progress = None):
     origsuffix = GetOrigExt(target)
 
     if len(inputs) == 1 and origsuffix == GetOrigExt(infile):
-        # It must be a simple copy operation.
+        # It must be a simple copy operation.  The contents are compared
+        # first, since the target may already be a copy of the input, as
+        # after the dependency cache was discarded.
         ProgressOutput(progress, "Copying file", target)
-        CopyFile(target, infile)
+        ConditionalCopyFile(target, infile)
         if origsuffix == ".exe" and GetHost() != "windows":
-            os.system("chmod +x \"%s\"" % target)
+            os.chmod(target, os.stat(target).st_mode | 0o111)
         return
 
     elif infile.endswith(".py"):
@@ -2352,8 +2376,9 @@ def CompileAnything(target, inputs, opts, progress = None):
             tplatform = GetTarget()
             if tplatform == "darwin":
                 # On Mac, libraries are named like libpanda.1.2.dylib
-                if target.lower().endswith(".dylib"):
-                    target = target[:-5] + MAJOR_VERSION + ".dylib"
+                root, ext = os.path.splitext(target)
+                if ext.lower() == ".dylib":
+                    target = root + "." + MAJOR_VERSION + ".dylib"
                     SetOrigExt(target, origsuffix)
             elif tplatform not in ("windows", "android", "emscripten"):
                 # On Linux, libraries are named like libpanda.so.1.2
@@ -2385,30 +2410,14 @@ def CompileAnything(target, inputs, opts, progress = None):
         ProgressOutput(progress, "Building Java class", target)
         return CompileJava(target, infile, opts)
     elif origsuffix == ".obj":
-        if (infile.endswith(".cxx")):
-            ProgressOutput(progress, "Building C++ object", target)
-            return CompileCxx(target, infile, opts)
-        elif infile.endswith(".c"):
-            ProgressOutput(progress, "Building C object", target)
-            return CompileCxx(target, infile, opts)
-        elif infile.endswith(".mm"):
-            ProgressOutput(progress, "Building Objective-C++ object", target)
-            return CompileCxx(target, infile, opts)
-        elif infile.endswith(".yxx"):
-            ProgressOutput(progress, "Building Bison object", target)
-            return CompileBison(target, infile, opts)
-        elif infile.endswith(".lxx"):
-            ProgressOutput(progress, "Building Flex object", target)
-            return CompileFlex(target, infile, opts)
-        elif infile.endswith(".in"):
+        if infile.endswith(".in"):
             ProgressOutput(progress, "Building Interrogate object", target)
             return CompileImod(target, inputs, opts)
-        elif infile.endswith(".rc"):
-            ProgressOutput(progress, "Building resource object", target)
-            return CompileRes(target, infile, opts)
-        elif infile.endswith(".r"):
-            ProgressOutput(progress, "Building resource object", target)
-            return CompileRsrc(target, infile, opts)
+        compiler = OBJ_COMPILERS.get(os.path.splitext(infile)[1])
+        if compiler is not None:
+            msg, func = compiler
+            ProgressOutput(progress, msg, target)
+            return func(target, infile, opts)
     elif origsuffix == ".dex":
         ProgressOutput(progress, "Building Dalvik object", target)
         return CompileDalvik(target, inputs, opts)
@@ -2552,21 +2561,22 @@ PRC_PARAMETERS=[
     ("PRC_INC_TRUST_LEVEL",            '0',                      '0'),
 ]
 
+# These are not available for ARM, period.
+DTOOL_CONFIG_NOT_ON_ARM = frozenset(('HAVE_CG', 'HAVE_CGGL', 'HAVE_CGDX9'))
+ARM_GUARDED_DEFINE = "#ifdef __aarch64__\n#undef %s\n#else\n#define %s %s\n#endif"
+
 def WriteConfigSettings():
-    dtool_config={}
-    prc_parameters={}
+    target = GetTarget()
+    optimize = GetOptimize()
+
     speedtree_parameters={}
 
-    if (GetTarget() == 'windows'):
-        for key,win,unix in DTOOL_CONFIG:
-            dtool_config[key] = win
-        for key,win,unix in PRC_PARAMETERS:
-            prc_parameters[key] = win
+    if (target == 'windows'):
+        dtool_config = {key: win for (key, win, unix) in DTOOL_CONFIG}
+        prc_parameters = {key: win for (key, win, unix) in PRC_PARAMETERS}
     else:
-        for key,win,unix in DTOOL_CONFIG:
-            dtool_config[key] = unix
-        for key,win,unix in PRC_PARAMETERS:
-            prc_parameters[key] = unix
+        dtool_config = {key: unix for (key, win, unix) in DTOOL_CONFIG}
+        prc_parameters = {key: unix for (key, win, unix) in PRC_PARAMETERS}
 
     for x in PkgListGet():
         if ("HAVE_"+x in dtool_config):
@@ -2577,7 +2587,7 @@ def WriteConfigSettings():
 
     dtool_config["HAVE_NET"] = '1'
 
-    if GetTarget() == 'windows':
+    if target == 'windows':
         if not PkgSkip("MIMALLOC"):
             # This is faster than both DeletedBufferChain and malloc,
             # especially in the multi-threaded case.
@@ -2596,13 +2606,13 @@ def WriteConfigSettings():
         dtool_config["HAVE_CGGL"] = '1'
         dtool_config["HAVE_CGDX9"] = '1'
 
-    if GetTarget() not in ("linux", "android"):
+    if target not in ("linux", "android"):
         dtool_config["HAVE_PROC_SELF_EXE"] = 'UNDEF'
         dtool_config["HAVE_PROC_SELF_MAPS"] = 'UNDEF'
         dtool_config["HAVE_PROC_SELF_CMDLINE"] = 'UNDEF'
         dtool_config["HAVE_PROC_SELF_ENVIRON"] = 'UNDEF'
 
-    if (GetTarget() == "darwin"):
+    if (target == "darwin"):
         dtool_config["PYTHON_FRAMEWORK"] = 'Python'
         dtool_config["PHAVE_MALLOC_H"] = 'UNDEF'
         dtool_config["PHAVE_SYS_MALLOC_H"] = '1'
@@ -2613,7 +2623,7 @@ def WriteConfigSettings():
         dtool_config["PHAVE_LINUX_INPUT_H"] = 'UNDEF'
         dtool_config["IS_OSX"] = '1'
 
-    if (GetTarget() == "freebsd"):
+    if (target == "freebsd"):
         dtool_config["IS_LINUX"] = 'UNDEF'
         dtool_config["HAVE_VIDEO4LINUX"] = 'UNDEF'
         dtool_config["IS_FREEBSD"] = '1'
@@ -2623,14 +2633,14 @@ def WriteConfigSettings():
         dtool_config["HAVE_PROC_CURPROC_MAP"] = '1'
         dtool_config["HAVE_PROC_CURPROC_CMDLINE"] = '1'
 
-    if (GetTarget() == "android"):
+    if (target == "android"):
         # Android does have RTTI, but we disable it anyway.
         dtool_config["HAVE_RTTI"] = 'UNDEF'
         dtool_config["PHAVE_GLOB_H"] = 'UNDEF'
         dtool_config["PHAVE_LOCKF"] = 'UNDEF'
         dtool_config["HAVE_VIDEO4LINUX"] = 'UNDEF'
 
-    if (GetTarget() == "emscripten"):
+    if (target == "emscripten"):
         # There are no threads in JavaScript, so don't bother using them.
         dtool_config["HAVE_THREADS"] = 'UNDEF'
         dtool_config["DO_PIPELINING"] = 'UNDEF'
@@ -2650,29 +2660,29 @@ def WriteConfigSettings():
         prc_parameters["PRC_PATTERNS"] = 'UNDEF'
         prc_parameters["PRC_ENCRYPTED_PATTERNS"] = 'UNDEF'
 
-    if (GetOptimize() <= 2 and GetTarget() == "windows"):
+    if (optimize <= 2 and target == "windows"):
         dtool_config["USE_DEBUG_PYTHON"] = '1'
 
-    if (GetOptimize() <= 3):
+    if (optimize <= 3):
         if (dtool_config["HAVE_NET"] != 'UNDEF'):
             dtool_config["DO_PSTATS"] = '1'
 
-    if (GetOptimize() <= 3):
+    if (optimize <= 3):
         dtool_config["DO_DCAST"] = '1'
 
-    if (GetOptimize() <= 3):
+    if (optimize <= 3):
         dtool_config["DO_COLLISION_RECORDING"] = '1'
 
-    if (GetOptimize() <= 3) and GetTarget() != 'emscripten':
+    if (optimize <= 3) and target != 'emscripten':
         dtool_config["DO_MEMORY_USAGE"] = '1'
 
-    if (GetOptimize() <= 3):
+    if (optimize <= 3):
         dtool_config["NOTIFY_DEBUG"] = '1'
 
-    if (GetOptimize() >= 4):
+    if (optimize >= 4):
         dtool_config["PRC_SAVE_DESCRIPTIONS"] = 'UNDEF'
 
-    if (GetOptimize() >= 4):
+    if (optimize >= 4):
         # Disable RTTI on release builds.
         dtool_config["HAVE_RTTI"] = 'UNDEF'
 
@@ -2692,39 +2702,34 @@ def WriteConfigSettings():
 
         speedtree_parameters["SPEEDTREE_BIN_DIR"] = (SDK["SPEEDTREE"] + "/Bin")
 
-    conf = "/* prc_parameters.h.  Generated automatically by makepanda.py */\n"
+    conf = ["/* prc_parameters.h.  Generated automatically by makepanda.py */"]
     for key in sorted(prc_parameters.keys()):
         if ((key == "DEFAULT_PRC_DIR") or (key[:4]=="PRC_")):
             val = OverrideValue(key, prc_parameters[key])
-            if (val == 'UNDEF'): conf = conf + "#undef " + key + "\n"
-            else:                conf = conf + "#define " + key + " " + val + "\n"
-    ConditionalWriteFile(GetOutputDir() + '/include/prc_parameters.h', conf)
+            if (val == 'UNDEF'): conf.append("#undef " + key)
+            else:                conf.append("#define " + key + " " + val)
+    ConditionalWriteFile(GetOutputDir() + '/include/prc_parameters.h', "\n".join(conf) + "\n")
 
-    conf = "/* dtool_config.h.  Generated automatically by makepanda.py */\n"
+    conf = ["/* dtool_config.h.  Generated automatically by makepanda.py */"]
     for key in sorted(dtool_config.keys()):
         val = OverrideValue(key, dtool_config[key])
 
-        if key in ('HAVE_CG', 'HAVE_CGGL', 'HAVE_CGDX9') and val != 'UNDEF':
-            # These are not available for ARM, period.
-            conf = conf + "#ifdef __aarch64__\n"
-            conf = conf + "#undef " + key + "\n"
-            conf = conf + "#else\n"
-            conf = conf + "#define " + key + " " + val + "\n"
-            conf = conf + "#endif\n"
-        elif val == 'UNDEF':
-            conf = conf + "#undef " + key + "\n"
+        if val == 'UNDEF':
+            conf.append("#undef " + key)
+        elif key in DTOOL_CONFIG_NOT_ON_ARM:
+            conf.append(ARM_GUARDED_DEFINE % (key, key, val))
         else:
-            conf = conf + "#define " + key + " " + val + "\n"
+            conf.append("#define " + key + " " + val)
 
-    ConditionalWriteFile(GetOutputDir() + '/include/dtool_config.h', conf)
+    ConditionalWriteFile(GetOutputDir() + '/include/dtool_config.h', "\n".join(conf) + "\n")
 
     if not PkgSkip("SPEEDTREE"):
-        conf = "/* speedtree_parameters.h.  Generated automatically by makepanda.py */\n"
+        conf = ["/* speedtree_parameters.h.  Generated automatically by makepanda.py */"]
         for key in sorted(speedtree_parameters.keys()):
             val = OverrideValue(key, speedtree_parameters[key])
-            if (val == 'UNDEF'): conf = conf + "#undef " + key + "\n"
-            else:                conf = conf + "#define " + key + " \"" + val.replace("\\", "\\\\") + "\"\n"
-        ConditionalWriteFile(GetOutputDir() + '/include/speedtree_parameters.h', conf)
+            if (val == 'UNDEF'): conf.append("#undef " + key)
+            else:                conf.append("#define " + key + " \"" + val.replace("\\", "\\\\") + "\"")
+        ConditionalWriteFile(GetOutputDir() + '/include/speedtree_parameters.h', "\n".join(conf) + "\n")
 
     for x in PkgListGet():
         if (PkgSkip(x)): ConditionalWriteFile(GetOutputDir() + '/tmp/dtool_have_'+x.lower()+'.dat', "0\n")
@@ -2735,7 +2740,7 @@ def WriteConfigSettings():
 
     # This is useful for tools like makepackage that need to know things about
     # the build parameters.
-    ConditionalWriteFile(GetOutputDir() + '/tmp/optimize.dat', str(GetOptimize()))
+    ConditionalWriteFile(GetOutputDir() + '/tmp/optimize.dat', str(optimize))
 
 
 WriteConfigSettings()
@@ -6595,22 +6600,19 @@ def BuildWorker(taskqueue, donequeue):
         except:
             donequeue.put(0)
 
-def AllSourcesReady(task, pending):
-    sources = task[3]
-    for x in sources:
-        if x in pending:
-            return False
-    sources = task[1][1]
-    for x in sources:
-        if x in pending:
-            return False
-    altsources = task[4]
-    for x in altsources:
-        if x in pending:
-            return False
-    return True
+def PendingSources(task, pending):
+    """Returns the set of inputs of the task that still have to be built."""
+    waiting = set()
+    for sources in (task[3], task[1][1], task[4]):
+        for x in sources:
+            if x in pending:
+                waiting.add(x)
+    return waiting
 
 def ParallelMake(tasklist):
+    import heapq
+    import queue
+
     # Create the communication queues.
     donequeue = queue.Queue()
     taskqueue = queue.Queue()
@@ -6622,6 +6624,31 @@ def ParallelMake(tasklist):
     for task in tasklist:
         for target in task[2]:
             pending[target] = 1
+    # For each task, keep track of which of its sources are still pending,
+    # and for each pending target, which tasks are waiting on it.  This
+    # way, finishing a target only revisits the tasks that depend on it.
+    waiting = []
+    dependents = {}
+    ready = []
+    for i, task in enumerate(tasklist):
+        sources = PendingSources(task, pending)
+        waiting.append(sources)
+        for x in sources:
+            dependents.setdefault(x, []).append(i)
+        if not sources:
+            ready.append(i)
+    # Ready tasks are started in the order in which they were added.
+    heapq.heapify(ready)
+    remaining = len(tasklist)
+
+    def TargetsDone(task):
+        for target in task[2]:
+            del pending[target]
+            for i in dependents.pop(target, ()):
+                waiting[i].discard(target)
+                if not waiting[i]:
+                    heapq.heappush(ready, i)
+
     # Create the workers
     for slave in range(THREADCOUNT):
         th = threading.Thread(target=BuildWorker, args=[taskqueue, donequeue])
@@ -6630,23 +6657,16 @@ def ParallelMake(tasklist):
     # Feed tasks to the workers.
     tasksqueued = 0
     while True:
-        if tasksqueued < THREADCOUNT:
-            extras = []
-            for task in tasklist:
-                if tasksqueued < THREADCOUNT and AllSourcesReady(task, pending):
-                    if NeedsBuild(task[2], task[3]):
-                        tasksqueued += 1
-                        taskqueue.put(task)
-                    else:
-                        for target in task[2]:
-                            del pending[target]
-                else:
-                    extras.append(task)
-            tasklist = extras
+        while tasksqueued < THREADCOUNT and ready:
+            task = tasklist[heapq.heappop(ready)]
+            remaining -= 1
+            if NeedsBuild(task[2], task[3]):
+                tasksqueued += 1
+                taskqueue.put(task)
+            else:
+                TargetsDone(task)
         sys.stdout.flush()
         if tasksqueued == 0:
-            if len(tasklist) > 0:
-                continue
             break
         donetask = donequeue.get()
         if donetask == 0:
@@ -6654,14 +6674,14 @@ def ParallelMake(tasklist):
         sys.stdout.flush()
         tasksqueued -= 1
         JustBuilt(donetask[2], donetask[3])
-        for target in donetask[2]:
-            del pending[target]
+        TargetsDone(donetask)
     # Kill the workers.
     for slave in range(THREADCOUNT):
         taskqueue.put(0)
     # Make sure there aren't any unsatisfied tasks
-    if len(tasklist) > 0:
-        exit("Dependency problems: {0} tasks not finished. First task unsatisfied: {1}".format(len(tasklist), tasklist[0][2]))
+    if remaining > 0:
+        unsatisfied = [task for i, task in enumerate(tasklist) if waiting[i]]
+        exit("Dependency problems: {0} tasks not finished. First task unsatisfied: {1}".format(len(unsatisfied), unsatisfied[0][2]))
 
 
 def SequentialMake(tasklist):
@@ -6,6 +6,7 @@
 ########################################################################
 
 import configparser
+import filecmp
 import fnmatch
 import getpass
 import glob
@@ -13,6 +14,7 @@ import os
 import pickle
 import platform
 import re
+import shlex
 import shutil
 import signal
 import subprocess
@@ -36,6 +38,7 @@ THIRDPARTYDIR = None
 OPTIMIZE = "3"
 VERBOSE = False
 LINK_ALL_STATIC = False
+HOST = None
 TARGET = None
 TARGET_ARCH = None
 HAS_TARGET_ARCH = False
@@ -53,7 +56,6 @@ else:
     DEFAULT_CC = "gcc"
     DEFAULT_CXX = "g++"
 DEFAULT_AR = "ar"
-DEFAULT_RANLIB = "ranlib"
 
 # Is the current Python a 32-bit or 64-bit build?  There doesn't
 # appear to be a universal test for this.
@@ -275,9 +277,7 @@ def ProgressOutput(progress, msg, target = None):
     else:
         suffix = GetColor()
 
-    print(''.join((prefix, msg, suffix)))
-    sys.stdout.flush()
-    sys.stderr.flush()
+    print(''.join((prefix, msg, suffix)), flush=True)
 
 def exit(msg = ""):
     sys.stdout.flush()
@@ -320,26 +320,33 @@ def Error(msg, extra=None):
 
 def GetHost():
     """Returns the host platform, ie. the one we're compiling on."""
+    global HOST
+    if HOST is not None:
+        return HOST
+
     if sys.platform == 'win32' or sys.platform == 'cygwin':
         # sys.platform is win32 on 64-bits Windows as well.
-        return 'windows'
+        HOST = 'windows'
     elif sys.platform == 'darwin':
-        return 'darwin'
+        HOST = 'darwin'
     elif sys.platform.startswith('linux'):
         try:
             # Python seems to offer no built-in way to check this.
+            # This spawns a process, which is why the result is cached.
             osname = subprocess.check_output(["uname", "-o"])
             if osname.strip().lower() == b'android':
-                return 'android'
+                HOST = 'android'
             else:
-                return 'linux'
+                HOST = 'linux'
         except:
-            return 'linux'
+            HOST = 'linux'
     elif sys.platform.startswith('freebsd'):
-        return 'freebsd'
+        HOST = 'freebsd'
     else:
         exit('Unrecognized sys.platform: %s' % (sys.platform))
 
+    return HOST
+
 def GetHostArch():
     """Returns the architecture we're compiling on.
     Its value is also platform-dependent, as different platforms
@@ -361,7 +368,7 @@ def SetTarget(target, arch=None):
     be called *before* any calls are made to GetOutputDir, GetCC, etc."""
     global TARGET, TARGET_ARCH, HAS_TARGET_ARCH
     global TOOLCHAIN_PREFIX
-    global DEFAULT_CC, DEFAULT_CXX, DEFAULT_AR, DEFAULT_RANLIB
+    global DEFAULT_CC, DEFAULT_CXX, DEFAULT_AR
 
     host = GetHost()
     host_arch = GetHostArch()
@@ -463,7 +470,6 @@ def SetTarget(target, arch=None):
         DEFAULT_CC = "emcc"
         DEFAULT_CXX = "em++"
         DEFAULT_AR = "emar"
-        DEFAULT_RANLIB = "emranlib"
 
         arch = "wasm32"
 
@@ -531,13 +537,6 @@ def GetAR():
     else:
         return DEFAULT_AR
 
-def GetRanlib():
-    # Hack
-    if TARGET == 'android':
-        return TOOLCHAIN_PREFIX + DEFAULT_RANLIB
-    else:
-        return DEFAULT_RANLIB
-
 BISON = None
 def GetBison():
     global BISON
@@ -612,6 +611,21 @@ def GetSevenZip():
 def HasSevenZip():
     return GetSevenZip() is not None
 
+REZ = None
+def GetRez():
+    global REZ
+    if REZ is not None:
+        return REZ
+
+    if os.path.isfile("/usr/bin/Rez"):
+        REZ = "Rez"
+    elif os.path.isfile("/Library/Developer/CommandLineTools/usr/bin/Rez"):
+        REZ = "/Library/Developer/CommandLineTools/usr/bin/Rez"
+    else:
+        REZ = "/Developer/Tools/Rez"
+
+    return REZ
+
 ########################################################################
 ##
 ## LocateBinary
@@ -655,10 +669,22 @@ def LocateBinary(binary):
 ##
 ########################################################################
 
-def oscmd(cmd, ignoreError = False, cwd=None):
+def oscmd(cmd, ignoreError = False, cwd=None, env=None):
+    # A command may also be given as a list of arguments, which are passed
+    # as-is instead of going through the shell.
+    argv = None
+    if not isinstance(cmd, str):
+        argv = list(cmd)
+        if sys.platform == "win32":
+            cmd = subprocess.list2cmdline(argv)
+        else:
+            cmd = shlex.join(argv)
+
     if VERBOSE:
-        print(GetColor("blue") + cmd.split(" ", 1)[0] + " " + GetColor("magenta") + cmd.split(" ", 1)[1] + GetColor())
-    sys.stdout.flush()
+        exe, _, args = cmd.partition(" ")
+        print(GetColor("blue") + exe + " " + GetColor("magenta") + args + GetColor(), flush=True)
+    else:
+        sys.stdout.flush()
 
     if sys.platform == "win32":
         if cmd[0] == '"':
@@ -673,7 +699,10 @@ def oscmd(cmd, ignoreError = False, cwd=None):
             pwd = os.getcwd()
             os.chdir(cwd)
 
-        res = os.spawnl(os.P_WAIT, exe_path, cmd)
+        if env is not None:
+            res = os.spawnle(os.P_WAIT, exe_path, cmd, env)
+        else:
+            res = os.spawnl(os.P_WAIT, exe_path, cmd)
 
         if res == -1073741510: # 0xc000013a
             exit("keyboard interrupt")
@@ -681,9 +710,18 @@ def oscmd(cmd, ignoreError = False, cwd=None):
         if cwd is not None:
             os.chdir(pwd)
     else:
-        cmd = cmd.replace(';', '\\;')
-        cmd = cmd.replace('$', '\\$')
-        res = subprocess.call(cmd, cwd=cwd, shell=True)
+        if argv is not None:
+            try:
+                res = subprocess.call(argv, cwd=cwd, env=env)
+            except FileNotFoundError:
+                exit("Cannot find "+argv[0]+" on search path")
+            # Report death by a signal the same way the shell does.
+            if res < 0:
+                res = 128 - res
+        else:
+            cmd = cmd.replace(';', '\\;')
+            cmd = cmd.replace('$', '\\$')
+            res = subprocess.call(cmd, cwd=cwd, env=env, shell=True)
         sig = res & 0x7F
         if (GetVerbose() and res != 0):
             print(ColorText("red", "Process exited with exit status %d and signal code %d" % ((res & 0xFF00) >> 8, sig)))
@@ -939,8 +977,8 @@ def SaveDependencyCache():
     if icache is not None:
         print("Storing dependency cache.")
         pickle.dump(DCACHE_VERSION, icache, 0)
-        pickle.dump(CXXINCLUDECACHE, icache, 2)
-        pickle.dump(BUILTFROMCACHE, icache, 2)
+        pickle.dump(CXXINCLUDECACHE, icache, pickle.HIGHEST_PROTOCOL)
+        pickle.dump(BUILTFROMCACHE, icache, pickle.HIGHEST_PROTOCOL)
         icache.close()
 
 def LoadDependencyCache():
@@ -953,13 +991,13 @@ def LoadDependencyCache():
         icache = None
 
     if icache is not None:
-        ver = pickle.load(icache)
-        if ver == DCACHE_VERSION:
-            CXXINCLUDECACHE = pickle.load(icache)
-            BUILTFROMCACHE = pickle.load(icache)
-            icache.close()
-        else:
-            print("Cannot load dependency cache, version is too old!")
+        with icache:
+            ver = pickle.load(icache)
+            if ver == DCACHE_VERSION:
+                CXXINCLUDECACHE = pickle.load(icache)
+                BUILTFROMCACHE = pickle.load(icache)
+            else:
+                print("Cannot load dependency cache, version is too old!")
 
 ########################################################################
 ##
@@ -1242,16 +1280,26 @@ def WriteBinaryFile(wfile, data):
         ex = sys.exc_info()[1]
         exit("Cannot write to %s: %s" % (wfile, ex))
 
+def CopyBinaryFile(dstfile, srcfile):
+    # Unlike reading and writing the data in Python, this lets the OS copy
+    # the file directly, eg. using sendfile() on Linux.
+    try:
+        shutil.copyfile(srcfile, dstfile)
+    except:
+        ex = sys.exc_info()[1]
+        exit("Cannot copy %s to %s: %s" % (srcfile, dstfile, ex))
+
 def ConditionalWriteFile(dest, data, newline=None):
     if newline is not None:
         data = data.replace('\r\n', '\n')
         data = data.replace('\r', '\n')
         data = data.replace('\n', newline)
 
+    # Read without newline translation, since WriteFile doesn't translate
+    # either; otherwise files with \r\n line endings never compare equal.
     try:
-        rfile = open(dest, 'r')
-        contents = rfile.read(-1)
-        rfile.close()
+        with open(dest, 'r', newline='') as rfile:
+            contents = rfile.read(-1)
     except:
         contents = 0
 
@@ -1425,6 +1473,36 @@ def GetThirdpartyDir():
 
     return THIRDPARTYDIR
 
+THIRDPARTYLIBCACHE = {}
+
+def GetThirdpartyLibs(pkgdir):
+    """Returns the set of files in the lib directory of the given package
+    in the thirdparty directory, ie. the names in thirdparty/win-libs-vc14/
+    openexr/lib/ for "openexr".  The directory is only listed once, which
+    is cheaper than checking for each candidate file separately.  The
+    names are normalized using os.path.normcase, so use HasThirdpartyLib
+    to check whether a particular file is present."""
+    if pkgdir in THIRDPARTYLIBCACHE:
+        return THIRDPARTYLIBCACHE[pkgdir]
+
+    libs = set()
+    thirdparty_dir = GetThirdpartyDir()
+    if thirdparty_dir is not None:
+        try:
+            for name in os.listdir(thirdparty_dir + pkgdir + "/lib"):
+                libs.add(os.path.normcase(name))
+        except OSError:
+            pass
+
+    libs = frozenset(libs)
+    THIRDPARTYLIBCACHE[pkgdir] = libs
+    return libs
+
+def HasThirdpartyLib(pkgdir, filename):
+    """Returns true if the lib directory of the given thirdparty package
+    contains a file with the given name."""
+    return os.path.normcase(filename) in GetThirdpartyLibs(pkgdir)
+
 ########################################################################
 ##
 ## Gets or sets the output directory, by default "built".
@@ -1669,13 +1747,23 @@ def PkgConfigGetDefSymbols(pkgname, tool = "pkg-config"):
 
 def PkgConfigEnable(opt, pkgname, tool = "pkg-config"):
     """Adds the libraries and includes to IncDirectory, LibName and LibDirectory."""
-    for i in PkgConfigGetIncDirs(pkgname, tool):
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Each of these queries spawns a separate process, so run them at the
+    # same time, but still register the results in a deterministic order.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        incdirs = executor.submit(PkgConfigGetIncDirs, pkgname, tool)
+        libdirs = executor.submit(PkgConfigGetLibDirs, pkgname, tool)
+        libs = executor.submit(PkgConfigGetLibs, pkgname, tool)
+        defs = executor.submit(PkgConfigGetDefSymbols, pkgname, tool)
+
+    for i in incdirs.result():
         IncDirectory(opt, i)
-    for i in PkgConfigGetLibDirs(pkgname, tool):
+    for i in libdirs.result():
         LibDirectory(opt, i)
-    for i in PkgConfigGetLibs(pkgname, tool):
+    for i in libs.result():
         LibName(opt, i)
-    for i, j in PkgConfigGetDefSymbols(pkgname, tool).items():
+    for i, j in defs.result().items():
         DefSymbol(opt, i, j)
 
 def LocateLibrary(lib, lpath=[], prefer_static=False):
@@ -3161,13 +3249,20 @@ def CopyFile(dstfile, srcfile):
                 shutil.rmtree(dstfile)
             os.symlink(os.readlink(srcfile), dstfile)
         else:
-            WriteBinaryFile(dstfile, ReadBinaryFile(srcfile))
+            CopyBinaryFile(dstfile, srcfile)
 
         if sys.platform == 'cygwin' and os.path.splitext(dstfile)[1].lower() in ('.dll', '.exe'):
             os.chmod(dstfile, 0o755)
 
         JustBuilt([dstfile], [srcfile])
 
+def ConditionalCopyFile(dstfile, srcfile):
+    # Leaves the destination untouched if it already has the same contents,
+    # so that whatever depends on it is not rebuilt needlessly.
+    if os.path.isfile(dstfile) and filecmp.cmp(dstfile, srcfile, shallow=False):
+        return
+    CopyFile(dstfile, srcfile)
+
 def CopyAllFiles(dstdir, srcdir, suffix=""):
     for x in GetDirectoryContents(srcdir, ["*"+suffix]):
         CopyFile(dstdir + x, srcdir + x)
@@ -3177,7 +3272,7 @@ def CopyAllHeaders(dir, skip=[]):
         srcfile = dir + "/" + filename
         dstfile = OUTPUTDIR + "/include/" + filename
         if (NeedsBuild([dstfile], [srcfile])):
-            WriteBinaryFile(dstfile, ReadBinaryFile(srcfile))
+            CopyBinaryFile(dstfile, srcfile)
             JustBuilt([dstfile], [srcfile])
 
 def CopyTree(dstdir, srcdir, omitVCS=True, exclude=()):
@@ -3239,7 +3334,7 @@ def CopyPythonTree(dstdir, srcdir, threads=0):
             base, ext = os.path.splitext(entry)
             if entry not in exclude_files and ext not in SUFFIX_INC + ['.pyc', '.pyo']:
                 if (NeedsBuild([dstpth], [srcpth])):
-                    WriteBinaryFile(dstpth, ReadBinaryFile(srcpth))
+                    CopyBinaryFile(dstpth, srcpth)
                     JustBuilt([dstpth], [srcpth])
 
         elif entry not in VCS_DIRS:
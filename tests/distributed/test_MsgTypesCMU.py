@@ -0,0 +1,34 @@
+from direct.distributed import MsgTypesCMU
+
+
+def test_msgtypes_cmu_unique():
+    # Every message type must map to a distinct id, otherwise the server
+    # will misinterpret one message as the other.
+    ids = list(MsgTypesCMU.MsgName2Id.values())
+    assert len(ids) == len(set(ids))
+
+    assert MsgTypesCMU.CLIENT_HEARTBEAT_CMU != MsgTypesCMU.CLIENT_OBJECT_UPDATE_FIELD_TARGETED_CMU
+
+
+def test_msgtypes_cmu_names():
+    for name, value in MsgTypesCMU.MsgName2Id.items():
+        assert getattr(MsgTypesCMU, name) == value
+        assert MsgTypesCMU.MsgId2Names[value] == name
+
+
+def test_msgtypes_cmu_constants_listed():
+    # Every message type constant must also be listed in MsgName2Id.  The
+    # MSG_ID_* names are range bounds, not message types.
+    for name, value in vars(MsgTypesCMU).items():
+        if name.endswith('_CMU') and not name.startswith('MSG_ID_') and isinstance(value, int):
+            assert MsgTypesCMU.MsgName2Id.get(name) == value
+
+
+def test_msgtypes_cmu_valid():
+    for value in MsgTypesCMU.MsgName2Id.values():
+        assert MsgTypesCMU.isValidMsgType(value)
+
+    assert not MsgTypesCMU.isValidMsgType(0)
+    assert not MsgTypesCMU.isValidMsgType(-1)
+    assert not MsgTypesCMU.isValidMsgType(MsgTypesCMU.MSG_ID_BASE_CMU - 1)
+    assert not MsgTypesCMU.isValidMsgType(MsgTypesCMU.MSG_ID_MAX_CMU + 1)